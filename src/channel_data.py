@@ -4,11 +4,12 @@ import os
 import re
 import json
 import logging
+import threading
 import time
 import hashlib
 from datetime import datetime
 from pathlib import Path
-from typing import Tuple, Callable, Optional, Dict, Iterable, Any
+from typing import Tuple, Callable, Optional, Dict, Iterable, Any, Union
 from collections import deque
 
 from telethon.tl.types import (
@@ -186,6 +187,12 @@ def _to_web_path(p: str) -> str:
 
 def _is_dangerous(doc, filename: str | None) -> bool:
     """Enhanced dangerous file detection"""
+    # Check file size first: a plain int compare (protection against zip bombs)
+    size = getattr(doc, "size", 0) or 0
+    if size > MAX_FILE_SIZE:
+        log.warning("Blocked oversized file: %d bytes (max %d)", size, MAX_FILE_SIZE)
+        return True
+    
     # Check extension
     fn_ext = (os.path.splitext(filename)[1].lower() if filename else "")
     if fn_ext in DANGEROUS_EXT:
@@ -198,12 +205,6 @@ def _is_dangerous(doc, filename: str | None) -> bool:
         log.warning("Blocked dangerous MIME type: %s", mime)
         return True
     
-    # Check file size (protection against zip bombs)
-    size = getattr(doc, "size", 0)
-    if size > MAX_FILE_SIZE:
-        log.warning("Blocked oversized file: %d bytes (max %d)", size, MAX_FILE_SIZE)
-        return True
-    
     return False
 
 
@@ -426,15 +427,19 @@ async def dump_dialog_to_json_and_media(
     out_root: str = "export",
     progress_every: int = 50,
     on_progress: Optional[Callable[[str, str, int], None]] = None,
+    on_batch: Optional[Callable[[str, str, list, int], None]] = None,
     on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
     on_media: Optional[Callable[[Dict[str, Any]], None]] = None,
-    pause_event: Optional[asyncio.Event] = None,
-    cancel_event: Optional[asyncio.Event] = None,
+    pause_event: Optional[Union[asyncio.Event, threading.Event]] = None,
+    cancel_event: Optional[Union[asyncio.Event, threading.Event]] = None,
     is_finish_requested: Optional[Callable[[], bool]] = None,
     skip_dangerous: bool = True,
 ) -> Tuple[str, str]:
     """
     Export a dialog with rate-limited media downloads and security checks.
+
+    on_batch(json_path, media_dir, new_messages, count) receives only the
+    messages saved since its previous call, right before on_progress.
     """
     entity = dialog.entity
     title = getattr(entity, "title", None) or getattr(entity, "first_name", None) or getattr(entity, "last_name", None) or "Untitled dialog"
@@ -490,6 +495,18 @@ async def dump_dialog_to_json_and_media(
         with open(json_path, "w", encoding="utf-8") as f:
             json.dump(result_messages, f, ensure_ascii=False, indent=2)
 
+    batch_start = 0
+
+    def _emit_batch() -> None:
+        nonlocal batch_start
+        if on_batch:
+            try:
+                on_batch(json_path, media_dir_abs, result_messages[batch_start:], count)
+            except Exception as e:
+                log.warning("on_batch callback failed: %s", e)
+        batch_start = len(result_messages)
+
+    _emit_batch()
     if on_progress:
         try:
             on_progress(json_path, media_dir_abs, count)
@@ -563,6 +580,7 @@ async def dump_dialog_to_json_and_media(
             with open(json_path, "w", encoding="utf-8") as f:
                 json.dump(result_messages, f, ensure_ascii=False, indent=2)
             log.info("Saved messages so far: %s", count)
+            _emit_batch()
             if on_progress:
                 try:
                     on_progress(json_path, media_dir_abs, count)
@@ -571,6 +589,7 @@ async def dump_dialog_to_json_and_media(
 
     with open(json_path, "w", encoding="utf-8") as f:
         json.dump(result_messages, f, ensure_ascii=False, indent=2)
+    _emit_batch()
     if on_progress:
         try:
             on_progress(json_path, media_dir_abs, count)
@@ -1,36 +1,138 @@
 # gui_app.py - SECURED VERSION
 import asyncio
+import collections
+import functools
 import os
-import queue
+import re
+import shutil
+import stat
 import subprocess
 import sys
 import threading
 import time
 import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk
-from typing import Any, Optional
+from typing import Any, Callable, Optional, Sequence
 import ctypes
-import hashlib
-from .logo_helper import load_logo_image, create_canvas_logo, create_tray_icon
-from PIL import ImageTk
 from .process_hardening import harden_process
 from .channel_data import dump_dialog_to_json_and_media
-
-try:
-    import pystray
-    from PIL import Image, ImageDraw
-except Exception:
-    pystray = None
-    Image = None
-    ImageDraw = None
-
-from .html_generator import generate_html
+from .html_generator import generate_html_from_messages
 from .telegram_api import authorize, list_user_dialogs
 
 # Apply crash-dump hardening in GUI mode as well
 harden_process()
 
 DEFAULT_PROGRESS_EVERY = 5
+DEFAULT_LOG_EVERY = 25  # Log every Nth plain-text message during export
+
+SEARCH_DEBOUNCE_MS = 80
+
+# Listbox prefixes per dialog kind
+_DIALOG_ICONS = {"channel": "[CH]", "group": "[GR]", "user": "[DM]"}
+
+LOG_MAX_LINES = 5000  # Oldest log lines are trimmed beyond this
+
+# Shared font tuples for styles and widgets
+_FONT_BASE = ("Segoe UI", 10)
+_FONT_BOLD = ("Segoe UI", 10, "bold")
+_FONT_TITLE = ("Segoe UI", 14, "bold")
+_FONT_HEADER = ("Segoe UI", 22, "bold")
+_FONT_INFO = ("Segoe UI", 9)
+
+# Styles used by the cards; their layouts are resolved once after theming
+_WARM_STYLES = (
+    "Card.TFrame", "Glass.TFrame", "CardInner.TFrame",
+    "Header.TLabel", "Title.TLabel", "Info.TLabel", "Body.TLabel", "Caption.TLabel",
+    "Accent.TButton", "Secondary.TButton", "Ghost.TButton",
+    "TCheckbutton", "TEntry", "Accent.Horizontal.TProgressbar", "TelegramBlue.TSeparator",
+)
+
+# UI event queue draining: the worker only sets a threading.Event when the
+# queue becomes non-empty (never blocks on Tk); the Tk thread polls that
+# flag every UI_POLL_MS and drains at most UI_EVENTS_PER_TICK per tick
+UI_EVENTS_PER_TICK = 512
+UI_POLL_MS = 16
+
+# Longest text the UI shows per event type: (payload key, max length).
+# The worker bounds strings before queueing so the Tk thread never slices.
+_EVENT_TEXT_LIMITS = {
+    "status": ("message", 100),
+    "error": ("message", 500),
+}
+
+# Quit waits for the worker's stop command, polling every EXIT_POLL_MS
+# for at most EXIT_WAIT_MAX seconds
+EXIT_POLL_MS = 20
+EXIT_WAIT_MAX = 3.0
+
+# Completed-export paths are re-checked on every click; stat results are
+# reused for this many seconds
+STAT_CACHE_TTL = 2.0
+
+# How long the stop command waits for cancelled tasks to unwind
+STOP_TASKS_TIMEOUT = 2.0
+
+# Per-file media status throttling: at most one update per interval, and in
+# byte mode only after this much more data arrived
+MEDIA_STATUS_INTERVAL = 0.1
+MEDIA_STATUS_MIN_BYTES = 256 * 1024
+
+# "+" followed by digits, spaces allowed between groups
+_PHONE_RE = re.compile(r"^\+ *\d[\d ]*$")
+
+
+@functools.lru_cache(maxsize=1)
+def _tray_support():
+    """Import pystray/Pillow on first tray use; (None, None) if unavailable"""
+    try:
+        import pystray
+        from PIL import Image
+    except Exception:
+        return None, None
+    return pystray, Image
+
+
+@functools.lru_cache(maxsize=4)
+def _make_tray_image(size: int = 64):
+    """Build the tray icon once per size; minimize cycles reuse the cached image"""
+    _, Image = _tray_support()
+    if Image is None:
+        return None
+    from .logo_helper import create_tray_icon
+
+    tray_img = create_tray_icon(size)
+    return tray_img if tray_img else Image.new('RGBA', (size, size), (0, 0, 0, 0))
+
+
+@functools.lru_cache(maxsize=None)
+def _system_opener() -> str:
+    """Absolute path of open/xdg-open, resolved once"""
+    opener = "open" if sys.platform == "darwin" else "xdg-open"
+    return shutil.which(opener) or opener
+
+
+def _list_trash_and_sessions() -> tuple[list[str], list[str]]:
+    """
+    List (session files, .DELETE_ME_ leftovers) in the working directory.
+
+    Single scandir pass; matches "*.session*" / "*.DELETE_ME_*" with
+    dot-files excluded, as glob did.
+    """
+    sessions: list[str] = []
+    trash: list[str] = []
+    try:
+        with os.scandir(".") as it:
+            for entry in it:
+                name = entry.name
+                if name.startswith("."):
+                    continue
+                if ".session" in name:
+                    sessions.append(name)
+                if ".DELETE_ME_" in name:
+                    trash.append(name)
+    except OSError:
+        pass
+    return sessions, trash
 
 # ═══════════════════════════════════════════════════
 # SECURITY: SECURE CREDENTIAL STORAGE
@@ -38,35 +140,38 @@ DEFAULT_PROGRESS_EVERY = 5
 class SecureVar:
     """Secure variable that clears memory on deletion"""
     
+    __slots__ = ("_value", "_cleared")
+    
     def __init__(self, value: str = ""):
-        self._value = value
+        # Kept as a mutable buffer so clear() can zero the actual bytes
+        self._value = bytearray(value.encode("utf-8")) if value else bytearray()
         self._cleared = False
     
     def set(self, value: str):
         """Set value"""
         self.clear()
-        self._value = str(value) if value else ""
+        self._value = bytearray(str(value).encode("utf-8")) if value else bytearray()
         self._cleared = False
     
     def get(self) -> str:
         """Get value"""
         if self._cleared:
             return ""
-        return self._value
+        return self._value.decode("utf-8")
     
     def clear(self):
         """Securely clear value from memory"""
         if self._cleared:
             return
         try:
-            if self._value:
-                # Attempt to overwrite memory
-                buf = ctypes.create_string_buffer(len(self._value.encode('utf-8')))
-                ctypes.memset(ctypes.addressof(buf), 0, len(self._value.encode('utf-8')))
+            n = len(self._value)
+            if n:
+                # Overwrite the credential bytes in place
+                ctypes.memset((ctypes.c_char * n).from_buffer(self._value), 0, n)
         except Exception:
             pass
         finally:
-            self._value = ""
+            self._value = bytearray()
             self._cleared = True
     
     def __del__(self):
@@ -76,28 +181,45 @@ class SecureVar:
 class Worker:
     """Background thread that talks to Telegram without blocking tkinter."""
 
-    def __init__(self, ui_queue: "queue.Queue[dict[str, Any]]") -> None:
+    def __init__(
+        self,
+        ui_queue: "collections.deque[tuple[str, dict[str, Any]]]",
+        ui_wakeup: threading.Event,
+    ) -> None:
+        # Single producer (the worker loop) / single consumer (Tk): deque
+        # append/popleft are atomic, so no Queue lock/condition per event.
+        # Calls made on the Tk thread emit via _emit_from_ui to stay on the loop.
         self.ui_queue = ui_queue
-        self.command_queue: queue.Queue = queue.Queue()
+        self.ui_wakeup = ui_wakeup
         self.thread = threading.Thread(target=self._thread_main, daemon=True)
-        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # Created up front so commands can be scheduled before the thread runs
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
         self.client = None
         self.dialogs = []
-        self._pending_inputs: set[asyncio.Future] = set()
-        self._export_pause_event: Optional[asyncio.Event] = None
-        self._export_cancel_event: Optional[asyncio.Event] = None
+        # Entity titles resolved once per dialog refresh ("" when unnamed)
+        self._dialog_titles: list[str] = []
+        # Input round-trips awaiting an answer from the UI thread
+        self._pending_inputs: set[asyncio.Queue] = set()
+        # threading.Event: flipped directly from the Tk thread, polled by the export
+        self._export_pause_event: Optional[threading.Event] = None
+        self._export_cancel_event: Optional[threading.Event] = None
         self._export_running = False
+        # connect/refresh replace the client and dialog list: run them one at
+        # a time and never while an export uses them
+        self._session_lock = asyncio.Lock()
         self._export_finish_requested = False
         self._current_dialog_title: Optional[str] = None
-        self._media_progress: dict[tuple[str, str], int] = {}
-        self._media_labels: dict[tuple[str, str], str] = {}
+        # Per-download state keyed by message id (one media per message)
+        self._media_progress: dict[int, int] = {}
+        self._media_labels: dict[int, str] = {}
+        self._media_last_emit: dict[int, float] = {}
+        self._media_last_bytes: dict[int, int] = {}
         self._cleanup_old_sessions()
     
     def _cleanup_old_sessions(self) -> None:
         """Remove .DELETE_ME files and orphaned sessions on startup"""
-        import glob
-        
-        for trash_file in glob.glob("*.DELETE_ME_*"):
+        _, trash = _list_trash_and_sessions()
+        for trash_file in trash:
             try:
                 os.remove(trash_file)
                 print(f"[CLEANUP] Removed old trash: {trash_file}")
@@ -107,49 +229,88 @@ class Worker:
     def start(self) -> None:
         self.thread.start()
 
-    def send_command(self, name: str, **payload: Any) -> None:
-        self.command_queue.put((name, payload))
+    def is_stopped(self) -> bool:
+        """True once the loop has finished the stop command and exited"""
+        return not self.thread.is_alive()
 
-    def resolve_future(self, fut: asyncio.Future, value: Optional[str]) -> None:
-        if not self.loop:
-            return
+    def send_command(self, name: str, **payload: Any) -> None:
+        asyncio.run_coroutine_threadsafe(self._dispatch(name, payload), self.loop)
 
-        def _set_result() -> None:
-            if not fut.done():
-                fut.set_result(value)
+    def resolve_input(self, answer: asyncio.Queue, value: Optional[str]) -> None:
+        self.loop.call_soon_threadsafe(self._put_input, answer, value)
 
-        self.loop.call_soon_threadsafe(_set_result)
+    @staticmethod
+    def _put_input(answer: asyncio.Queue, value: Optional[str]) -> None:
+        # First answer wins (a stop sentinel may already be queued)
+        if answer.empty():
+            answer.put_nowait(value)
 
     def _emit(self, event_type: str, **payload: Any) -> None:
-        self.ui_queue.put({"type": event_type, **payload})
+        # Events travel as (type, payload) tuples: the kwargs dict is handed
+        # over as-is instead of being copied into a merged {"type": ...} dict.
+        limit = _EVENT_TEXT_LIMITS.get(event_type)
+        if limit is not None:
+            key, size = limit
+            text = payload.get(key)
+            if text and len(text) > size:
+                payload[key] = text[:size - 3] + "..."
+        self.ui_queue.append((event_type, payload))
+        # Flag Tk once per drain: later events ride along until it clears.
+        # No event_generate here - with threaded Tcl it waits for the Tk
+        # thread, which would stall downloads behind a busy UI.
+        if not self.ui_wakeup.is_set():
+            self.ui_wakeup.set()
+
+    def _emit_from_ui(self, event_type: str, **payload: Any) -> None:
+        """_emit for callers on the Tk thread: hand the event to the loop"""
+        self.loop.call_soon_threadsafe(functools.partial(self._emit, event_type, **payload))
+
+    def _forget_media(self, key: int) -> None:
+        self._media_progress.pop(key, None)
+        self._media_labels.pop(key, None)
+        self._media_last_emit.pop(key, None)
+        self._media_last_bytes.pop(key, None)
 
     def _thread_main(self) -> None:
-        self.loop = asyncio.new_event_loop()
+        # The loop runs for the worker's lifetime; commands are scheduled
+        # into it as tasks, so control commands run alongside an export
         asyncio.set_event_loop(self.loop)
-        while True:
-            name, payload = self.command_queue.get()
-            if name == "stop":
-                self.loop.run_until_complete(self._handle_stop())
-                break
-            handler = getattr(self, f"_cmd_{name}", None)
-            if not handler:
-                self._emit("error", message=f"Unknown command: {name}")
-                continue
+        self.loop.run_forever()
+
+    async def _dispatch(self, name: str, payload: dict[str, Any]) -> None:
+        if name == "stop":
             try:
-                self.loop.run_until_complete(handler(**payload))
-            except Exception as exc:
-                self._emit("error", message=str(exc))
+                await self._handle_stop()
+            finally:
+                self.loop.stop()
+            return
+        handler = getattr(self, f"_cmd_{name}", None)
+        if not handler:
+            self._emit("error", message=f"Unknown command: {name}")
+            return
+        try:
+            await handler(**payload)
+        except Exception as exc:
+            self._emit("error", message=str(exc))
+
+    async def _cancel_pending_tasks(self) -> None:
+        """Cancel every other command task and wait for it to unwind"""
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=STOP_TASKS_TIMEOUT)
 
     async def _handle_stop(self) -> None:
         if self._export_cancel_event:
             self._export_cancel_event.set()
         if self._export_pause_event:
             self._export_pause_event.set()
-        if self.loop:
-            for fut in list(self._pending_inputs):
-                if not fut.done():
-                    fut.set_result(None)
-            self._pending_inputs.clear()
+        while self._pending_inputs:
+            self._put_input(self._pending_inputs.pop(), None)
+        # The export must be gone before its client is disconnected
+        await self._cancel_pending_tasks()
         
         # Disconnect client first (releases file handles)
         if self.client:
@@ -160,38 +321,40 @@ class Worker:
                 pass
         
         # Auto-delete session files
-        import glob
-        
+        sessions, trash = _list_trash_and_sessions()
         session_files_deleted = []
         session_files_failed = []
         
-        for session_file in glob.glob("*.session*"):
-            # Attempt 1: Direct deletion
+        # Attempt 1: Direct deletion of every file
+        locked = []
+        for session_file in sessions:
             try:
                 os.remove(session_file)
                 session_files_deleted.append(session_file)
                 self._emit("log", message=f"🗑️ Удалено: {session_file}")
-                continue
             except PermissionError:
-                pass
+                locked.append(session_file)
             except Exception as e:
                 self._emit("log", message=f"❌ Ошибка удаления {session_file}: {e}")
                 session_files_failed.append(session_file)
-                continue
 
-            # Attempt 2: Wait and retry
+        # Attempt 2: Wait once, then retry all locked files
+        still_locked = []
+        if locked:
+            await asyncio.sleep(0.3)
+        for session_file in locked:
             try:
-                time.sleep(0.3)
                 os.remove(session_file)
                 session_files_deleted.append(session_file)
                 self._emit("log", message=f"🗑️ Удалено (повтор): {session_file}")
-                continue
             except Exception:
-                pass
+                still_locked.append(session_file)
 
-            # Attempt 3: Rename for deletion on next start
+        # Attempt 3: Rename for deletion on next start
+        stamp = int(time.time())
+        for session_file in still_locked:
             try:
-                trash_name = f"{session_file}.DELETE_ME_{int(time.time())}"
+                trash_name = f"{session_file}.DELETE_ME_{stamp}"
                 os.rename(session_file, trash_name)
                 self._emit("log", message=f"🔄 Помечено для удаления: {session_file}")
                 try:
@@ -206,7 +369,7 @@ class Worker:
                 self._emit("log", message=f"❌ Не удалось обработать {session_file}: {e}")
 
         # Clean up old .DELETE_ME files
-        for old_trash in glob.glob("*.DELETE_ME_*"):
+        for old_trash in trash:
             try:
                 os.remove(old_trash)
                 self._emit("log", message=f"🗑️ Очищен старый мусор: {old_trash}")
@@ -227,6 +390,20 @@ class Worker:
         api_hash: str,
         phone: str,
         session_name: Optional[str],
+    ) -> None:
+        if self._export_running:
+            raise RuntimeError("Дождитесь окончания экспорта")
+        if self._session_lock.locked():
+            raise RuntimeError("Подключение уже выполняется")
+        async with self._session_lock:
+            await self._connect(api_id, api_hash, phone, session_name)
+
+    async def _connect(
+        self,
+        api_id: int,
+        api_hash: str,
+        phone: str,
+        session_name: Optional[str],
     ) -> None:
         if self.client:
             try:
@@ -260,9 +437,12 @@ class Worker:
         await self._send_dialogs()
 
     async def _cmd_refresh_dialogs(self) -> None:
-        if not self.client:
-            raise RuntimeError("Сначала подключите свой аккаунт")
-        await self._send_dialogs()
+        if self._export_running:
+            raise RuntimeError("Дождитесь окончания экспорта")
+        async with self._session_lock:
+            if not self.client:
+                raise RuntimeError("Сначала подключите свой аккаунт")
+            await self._send_dialogs()
 
     async def _cmd_export(
         self,
@@ -271,39 +451,41 @@ class Worker:
         block_dangerous: bool,
         refresh_seconds: Optional[int],
         progress_every: int,
+        log_every: int = DEFAULT_LOG_EVERY,
     ) -> None:
         if not self.client:
             raise RuntimeError("Сначала подключите свой аккаунт")
         if self._export_running:
             raise RuntimeError("Экспорт уже выполняется")
+        if self._session_lock.locked():
+            raise RuntimeError("Дождитесь окончания подключения")
 
-        indices = list(dict.fromkeys(dialog_indices))
+        # Listbox selections are already unique; dedupe only if needed
+        indices = list(dialog_indices)
+        if len(set(indices)) != len(indices):
+            indices = list(dict.fromkeys(indices))
         if not indices:
             raise RuntimeError("Выберите канал для экспорта")
 
-        self._export_pause_event = asyncio.Event()
+        # Resolve the selection against the current list once: a refresh
+        # started later must not change which chats this export walks
+        dialogs, titles = self.dialogs, self._dialog_titles
+        if any(idx < 0 or idx >= len(dialogs) or idx >= len(titles) for idx in indices):
+            raise RuntimeError("Выбранный диалог вне диапазона")
+        selected = [(dialogs[idx], titles[idx] or "Канал") for idx in indices]
+
+        self._export_pause_event = threading.Event()
         self._export_pause_event.set()
-        self._export_cancel_event = asyncio.Event()
+        self._export_cancel_event = threading.Event()
         self._export_running = True
         self._export_finish_requested = False
         self._emit("export_state", state="running")
         completed_successfully = False
 
         try:
-            for idx in indices:
-                if idx < 0 or idx >= len(self.dialogs):
-                    raise RuntimeError("Выбранный диалог вне диапазона")
-
-                dialog = self.dialogs[idx]
-                title = (
-                    getattr(dialog.entity, "title", None)
-                    or getattr(dialog.entity, "first_name", None)
-                    or getattr(dialog.entity, "last_name", None)
-                    or "Канал"
-                )
-
+            for dialog, title in selected:
                 # Sanitize title for logging
-                safe_title = title[:50] if title else "Канал"
+                safe_title = title[:50]
 
                 self._current_dialog_title = safe_title
                 self._emit("status", message=f"Подготовка экспорта: {safe_title}")
@@ -312,10 +494,12 @@ class Worker:
                 await self._run_single_export(
                     dialog=dialog,
                     title=title,
+                    safe_title=safe_title,
                     anonymize=anonymize,
                     block_dangerous=block_dangerous,
                     refresh_seconds=refresh_seconds,
                     progress_every=progress_every,
+                    log_every=log_every,
                 )
 
                 if self._export_finish_requested:
@@ -348,13 +532,13 @@ class Worker:
         self,
         dialog,
         title: str,
+        safe_title: str,
         anonymize: bool,
         block_dangerous: bool,
         refresh_seconds: Optional[int],
         progress_every: int,
+        log_every: int = DEFAULT_LOG_EVERY,
     ) -> None:
-        safe_title = title[:50] if title else "Канал"
-
         def on_progress(json_path: str, media_dir: str, count: int) -> None:
             self._emit(
                 "progress",
@@ -364,7 +548,16 @@ class Worker:
                 channel=safe_title,
             )
 
+        msg_log_counter = 0
+
         def on_message(info: dict[str, Any]) -> None:
+            nonlocal msg_log_counter
+            # Plain messages are logged every log_every-th time; messages
+            # with media are always logged
+            msg_log_counter += 1
+            if log_every > 1 and msg_log_counter % log_every and not info.get("media"):
+                return
+
             msg_id = info.get("id")
             count = info.get("count")
 
@@ -396,8 +589,7 @@ class Worker:
                     path_hint = media.get("path") or media.get("name") or "неизвестно"
                     self._emit("log", message=f"  сохранено {kind}: {path_hint}")
 
-        def on_media_event(info: dict[str, Any]) -> None:
-            stage = info.get("stage")
+        def describe_media(info: dict[str, Any]) -> tuple[str, str, str]:
             kind = (info.get("kind") or "файл").strip()
             name = (info.get("name") or info.get("path") or "медиа").strip()
             message_id = info.get("message_id")
@@ -406,49 +598,74 @@ class Worker:
             if len(name) > 50:
                 name = name[:47] + "..."
 
-            key = (safe_title, name)
             label = f"Загрузка {kind}: {name}"
             if message_id is not None:
                 label = f"{label} (сообщение {message_id})"
+            return kind, name, label
 
-            if stage == "start":
-                self._media_progress[key] = -1
-                self._media_labels[key] = label
-                self._emit("log", message=f"[{safe_title}] {label}")
-                self._emit("status", message=label)
+        def on_media_event(info: dict[str, Any]) -> None:
+            stage = info.get("stage")
+            message_id = info.get("message_id")
 
-            elif stage == "progress":
+            if stage == "progress":
+                # Hot path: decide whether to emit before formatting anything
+                if message_id is not None:
+                    key = message_id
+                else:
+                    key = hash((safe_title, describe_media(info)[1]))
                 percent = info.get("percent")
                 current = info.get("current")
-                total = info.get("total")
-                prev = self._media_progress.get(key, -1)
+                now = time.monotonic()
+                if now - self._media_last_emit.get(key, 0.0) < MEDIA_STATUS_INTERVAL and percent != 100:
+                    return
+
+                if percent is not None:
+                    if percent == self._media_progress.get(key, -1):
+                        return
+                    self._media_progress[key] = percent
+                else:
+                    if (current or 0) - self._media_last_bytes.get(key, 0) < MEDIA_STATUS_MIN_BYTES:
+                        return
+                    self._media_last_bytes[key] = current or 0
+                self._media_last_emit[key] = now
 
+                label = self._media_labels.get(key) or describe_media(info)[2]
                 if percent is not None:
-                    if percent != prev:
-                        self._media_progress[key] = percent
-                        status = f"{label} {percent}%"
-                        self._emit("status", message=status)
+                    status = f"{label} {percent}%"
                 else:
-                    status = f"{label} {current or 0}/{total or '?'} байт"
-                    self._emit("status", message=status)
+                    status = f"{label} {current or 0}/{info.get('total') or '?'} байт"
+                self._emit("status", message=status)
+                return
+
+            kind, name, label = describe_media(info)
+            key = message_id if message_id is not None else hash((safe_title, name))
+
+            if stage == "start":
+                self._media_progress[key] = -1
+                self._media_labels[key] = label
+                self._emit("log", message=f"[{safe_title}] {label}")
+                self._emit("status", message=label)
 
             elif stage == "complete":
-                self._media_progress.pop(key, None)
-                self._media_labels.pop(key, None)
+                self._forget_media(key)
                 self._emit("log", message=f"[{safe_title}] Сохранено {kind}: {name}")
                 self._emit("status", message=f"Сохранено {kind}: {name}")
 
             elif stage == "blocked":
                 reason = info.get("reason") or "заблокирован"
-                self._media_progress.pop(key, None)
-                self._media_labels.pop(key, None)
+                self._forget_media(key)
                 self._emit("log", message=f"[{safe_title}] Заблокирован {kind}: {name} ({reason})")
             
             elif stage == "error":
-                self._media_progress.pop(key, None)
-                self._media_labels.pop(key, None)
+                self._forget_media(key)
                 self._emit("log", message=f"[{safe_title}] Ошибка {kind}: {name}")
 
+        # Keep the saved messages so the final page needs no JSON re-read
+        saved_messages: list[dict[str, Any]] = []
+
+        def on_batch(json_path: str, media_dir: str, new_messages: list, count: int) -> None:
+            saved_messages.extend(new_messages)
+
         try:
             json_path, media_dir = await dump_dialog_to_json_and_media(
                 self.client,
@@ -456,6 +673,7 @@ class Worker:
                 out_root="export",
                 progress_every=progress_every,
                 on_progress=on_progress,
+                on_batch=on_batch,
                 on_message=on_message,
                 on_media=on_media_event,
                 pause_event=self._export_pause_event,
@@ -466,9 +684,10 @@ class Worker:
         except asyncio.CancelledError:
             raise
 
-        html_path = generate_html(
-            json_path=json_path,
-            media_root=media_dir,
+        html_path = generate_html_from_messages(
+            saved_messages,
+            media_dir,
+            os.path.join(os.path.dirname(json_path), "index.html"),
             channel_title=title,
             refresh_seconds=refresh_seconds,
             anonymize=anonymize,
@@ -485,57 +704,59 @@ class Worker:
         self._emit("status", message=f"Экспорт завершен: {safe_title}")
 
     def request_pause(self) -> bool:
-        if not self._export_running or not self._export_pause_event or not self.loop:
+        if not self._export_running or not self._export_pause_event:
             return False
         if not self._export_pause_event.is_set():
             return False
 
-        self.loop.call_soon_threadsafe(self._export_pause_event.clear)
-        self._emit("status", message="Экспорт приостановлен")
-        self._emit("log", message="Экспорт приостановлен")
-        self._emit("export_state", state="paused")
+        self._export_pause_event.clear()
+        self._emit_from_ui("status", message="Экспорт приостановлен")
+        self._emit_from_ui("log", message="Экспорт приостановлен")
+        self._emit_from_ui("export_state", state="paused")
         return True
 
     def request_resume(self) -> bool:
-        if not self._export_running or not self._export_pause_event or not self.loop:
+        if not self._export_running or not self._export_pause_event:
             return False
         if self._export_pause_event.is_set():
             return False
 
-        self.loop.call_soon_threadsafe(self._export_pause_event.set)
-        self._emit("status", message="Возобновление экспорта")
-        self._emit("log", message="Возобновление экспорта")
-        self._emit("export_state", state="resumed")
+        self._export_pause_event.set()
+        self._emit_from_ui("status", message="Возобновление экспорта")
+        self._emit_from_ui("log", message="Возобновление экспорта")
+        self._emit_from_ui("export_state", state="resumed")
         return True
 
     def request_finish(self) -> bool:
-        if not self._export_running or not self._export_cancel_event or not self.loop:
+        if not self._export_running or not self._export_cancel_event:
             return False
         if self._export_finish_requested:
             return False
 
         self._export_finish_requested = True
-        self.loop.call_soon_threadsafe(self._export_cancel_event.set)
+        self._export_cancel_event.set()
         if self._export_pause_event:
-            self.loop.call_soon_threadsafe(self._export_pause_event.set)
+            self._export_pause_event.set()
 
-        self._emit("log", message="Завершаем экспорт с текущими данными...")
-        self._emit("status", message="Финализация экспорта")
-        self._emit("export_state", state="finish_requested")
+        self._emit_from_ui("log", message="Завершаем экспорт с текущими данными...")
+        self._emit_from_ui("status", message="Финализация экспорта")
+        self._emit_from_ui("export_state", state="finish_requested")
         return True
 
     async def _run_input_dialog(self, prompt: str, title: str, secret: bool = False) -> str:
-        fut: asyncio.Future = self.loop.create_future()
-        self._pending_inputs.add(fut)
+        answer: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._pending_inputs.add(answer)
         self._emit(
             "input_request",
             prompt=prompt,
             title=title,
             secret=secret,
-            future=fut,
+            answer=answer,
         )
-        result = await fut
-        self._pending_inputs.discard(fut)
+        try:
+            result = await answer.get()
+        finally:
+            self._pending_inputs.discard(answer)
         if result is None:
             raise RuntimeError("Ввод отменен пользователем")
         return result.strip()
@@ -548,21 +769,17 @@ class Worker:
 
     async def _send_dialogs(self) -> None:
         dialogs = await list_user_dialogs(self.client)
-        self.dialogs = dialogs
-        items = []
-        
-        for idx, dlg in enumerate(dialogs):
-            title = (
-                getattr(dlg.entity, "title", None)
-                or getattr(dlg.entity, "first_name", None)
-                or getattr(dlg.entity, "last_name", None)
-                or "No title"
-            )
-            items.append({
-                "index": idx,
-                "title": title,
-                "kind": getattr(dlg, "_tgdl_kind", "?")
-            })
+        _ga = getattr
+        titles = [
+            _ga(e, "title", None) or _ga(e, "first_name", None) or _ga(e, "last_name", None) or ""
+            for e in (dlg.entity for dlg in dialogs)
+        ]
+        # Both lists are swapped together, with no await in between
+        self.dialogs, self._dialog_titles = dialogs, titles
+        items = [
+            {"index": idx, "title": title or "No title", "kind": _ga(dlg, "_tgdl_kind", "?")}
+            for idx, (dlg, title) in enumerate(zip(dialogs, titles))
+        ]
         
         self._emit("dialogs", items=items)
         self._emit("log", message=f"Dialogs updated: {len(items)}")
@@ -588,8 +805,9 @@ class App(tk.Tk):
         self.colors = self._setup_theme()
         self.configure(bg=self.colors["window"])
 
-        self.ui_queue: "queue.Queue[dict[str, Any]]" = queue.Queue()
-        self.worker = Worker(self.ui_queue)
+        self.ui_queue: "collections.deque[tuple[str, dict[str, Any]]]" = collections.deque()
+        self.ui_wakeup = threading.Event()
+        self.worker = Worker(self.ui_queue, self.ui_wakeup)
         self.worker.start()
 
         # SECURITY: Use SecureVar for sensitive data
@@ -607,24 +825,78 @@ class App(tk.Tk):
         self.channel_title_var = tk.StringVar(value="Select a channel to export")
 
         self.all_dialogs: list[dict[str, Any]] = []
+        self._dialog_by_index: dict[int, dict[str, Any]] = {}
         self.filtered_indices: list[int] = []
+        # Last search query and its matches, for narrowing searches
+        self._filter_query: Optional[str] = None
+        # Positions into the _dialog_* lists below
+        self._filter_matches: Sequence[int] = range(0)
+        # Parallel lists built once per dialogs refresh: dialog index,
+        # listbox row and lowercased title for each dialog
+        self._dialog_indices: list[int] = []
+        self._dialog_display: list[str] = []
+        self._dialog_titles_lc: list[str] = []
+        self._filter_after_id: Optional[str] = None
+        self._log_line_count = 0
+        self._input_dialog: Optional[dict[str, Any]] = None
+        # Input prompts wait here and are shown one at a time, outside the drain
+        self._input_requests: collections.deque[dict[str, Any]] = collections.deque()
+        self._input_active = False
+        # Root (width, height, rootx, rooty), refreshed on <Configure>
+        self._parent_geom: Optional[tuple[int, int, int, int]] = None
+        # (start, pause, finish, connect/refresh enabled, pause label) last
+        # applied to the buttons
+        self._export_controls_state: Optional[tuple[bool, bool, bool, bool, str]] = None
+        self._event_dispatch: dict[str, Callable[[dict[str, Any]], None]] = {
+            "log": self._ev_log,
+            "error": self._ev_error,
+            "dialogs": self._ev_dialogs,
+            "progress": self._ev_progress,
+            "export_done": self._ev_export_done,
+            "status": self._ev_status,
+            "export_state": self._ev_export_state,
+            "input_request": self._queue_input_request,
+        }
         self.export_running = False
         self.export_paused = False
         self.progress_animating = False
+        self._window_visible = True
         self.export_finishing = False
         self._last_export_info: Optional[dict[str, Any]] = None
         self.last_export_html: Optional[str] = None
         self.last_export_dir: Optional[str] = None
+        # Resolved once: every export is written below ./export
+        self._export_root = os.path.realpath("export")
+        # path -> (monotonic time, stat result or None when missing)
+        self._stat_cache: dict[str, tuple[float, Optional[os.stat_result]]] = {}
         self._tray_icon = None
         self._tray_thread: Optional[threading.Thread] = None
         self._tray_active = False
 
+        # Decode the logo and upload it to Tk once; widgets share the photo
+        from PIL import ImageTk
+        from .logo_helper import load_logo_image
+
+        logo_img = load_logo_image(56)
+        self._logo_photo_56 = ImageTk.PhotoImage(logo_img, master=self) if logo_img else None
+
+        # One class binding serves every ttk.Entry (kept alongside ttk's own)
+        self.bind_class("TEntry", "<Control-Key>", self._entry_clipboard_keys, add="+")
+
         self._build_layout()
 
-        self.search_var.trace_add("write", lambda *_: self._apply_filter())
+        self.search_var.trace_add("write", self._schedule_filter)
         self.dialog_list.bind("<<ListboxSelect>>", self._on_channel_select)
         self.protocol("WM_DELETE_WINDOW", self._on_close)
-        self.after(120, self._process_events)
+        self.bind("<Configure>", self._on_root_configure, add="+")
+        self.bind("<Map>", lambda e: self._on_root_visibility(e, True), add="+")
+        self.bind("<Unmap>", lambda e: self._on_root_visibility(e, False), add="+")
+        self.after(UI_POLL_MS, self._process_events)
+        # Build the tray icon in the background once the window is up, so
+        # the first minimize does no Pillow work on the Tk thread
+        self.after_idle(
+            lambda: threading.Thread(target=_make_tray_image, args=(64,), daemon=True).start()
+        )
 
     def __del__(self):
         """Secure cleanup on destruction"""
@@ -636,6 +908,10 @@ class App(tk.Tk):
             pass
 
     def _setup_theme(self) -> dict[str, str]:
+        # Styles are global to the Tcl interpreter: configure them only once
+        if getattr(self, "_theme_applied", False):
+            return self.colors
+
         try:
             import darkdetect
             is_dark = bool(darkdetect.isDark())
@@ -690,7 +966,7 @@ class App(tk.Tk):
             pass
 
         # Базовые стили
-        style.configure(".", background=colors["window"], foreground=colors["text"], font=("Segoe UI", 10))
+        style.configure(".", background=colors["window"], foreground=colors["text"], font=_FONT_BASE)
 
         # Карточки с тенью (эмуляция)
         style.configure("Card.TFrame", background=colors["card"], relief="flat", borderwidth=0)
@@ -698,11 +974,11 @@ class App(tk.Tk):
         style.configure("CardInner.TFrame", background=colors["card"], relief="flat", borderwidth=0)
 
         # Типографика Telegram 2025
-        style.configure("Header.TLabel", background=colors["glass"], foreground=colors["text"], font=("Segoe UI", 22, "bold"))
-        style.configure("Title.TLabel", background=colors["card"], foreground=colors["text"], font=("Segoe UI", 14, "bold"))
-        style.configure("Info.TLabel", background=colors["card"], foreground=colors["muted"], font=("Segoe UI", 9))
-        style.configure("Body.TLabel", background=colors["card"], foreground=colors["text"], font=("Segoe UI", 10, "bold"))
-        style.configure("Caption.TLabel", background=colors["glass"], foreground=colors["text_secondary"], font=("Segoe UI", 10))
+        style.configure("Header.TLabel", background=colors["glass"], foreground=colors["text"], font=_FONT_HEADER)
+        style.configure("Title.TLabel", background=colors["card"], foreground=colors["text"], font=_FONT_TITLE)
+        style.configure("Info.TLabel", background=colors["card"], foreground=colors["muted"], font=_FONT_INFO)
+        style.configure("Body.TLabel", background=colors["card"], foreground=colors["text"], font=_FONT_BOLD)
+        style.configure("Caption.TLabel", background=colors["glass"], foreground=colors["text_secondary"], font=_FONT_BASE)
 
         # Кнопки в стиле Telegram (жирный шрифт)
         style.configure("Accent.TButton",
@@ -711,7 +987,7 @@ class App(tk.Tk):
             padding=(20, 10),
             borderwidth=0,
             relief="flat",
-            font=("Segoe UI", 10, "bold")
+            font=_FONT_BOLD
         )
         style.map("Accent.TButton",
             background=[("active", colors["accent_hover"]), ("pressed", colors["accent_active"]), ("disabled", colors["muted"])],
@@ -724,7 +1000,7 @@ class App(tk.Tk):
             padding=(18, 10),
             borderwidth=0,
             relief="flat",
-            font=("Segoe UI", 10, "bold")
+            font=_FONT_BOLD
         )
         style.map("Secondary.TButton",
             background=[("active", colors["border"]), ("pressed", colors["border"]), ("disabled", colors["entry_bg"])],
@@ -737,7 +1013,7 @@ class App(tk.Tk):
             padding=(16, 10),
             borderwidth=0,
             relief="flat",
-            font=("Segoe UI", 10, "bold")
+            font=_FONT_BOLD
         )
         style.map("Ghost.TButton",
             foreground=[("active", colors["accent_hover"]), ("pressed", colors["accent_active"]), ("disabled", colors["muted"])]
@@ -748,7 +1024,7 @@ class App(tk.Tk):
             background=colors["card"],
             foreground=colors["text"],
             focuscolor=colors["accent"],
-            font=("Segoe UI", 10)
+            font=_FONT_BASE
         )
         style.map("TCheckbutton", foreground=[("disabled", colors["muted"])])
 
@@ -789,6 +1065,15 @@ class App(tk.Tk):
         self.option_add("*TButton*Font", "{Segoe UI} 10 bold")
         self.option_add("*TLabel*Font", "{Segoe UI} 10")
 
+        # Resolve each style's layout now, in one pass, instead of lazily
+        # while the cards are being built
+        for name in _WARM_STYLES:
+            try:
+                style.layout(name)
+            except tk.TclError:
+                pass
+
+        self._theme_applied = True
         return colors
 
     def _build_layout(self) -> None:
@@ -829,13 +1114,10 @@ class App(tk.Tk):
         self._build_logs_card()
     def _build_header(self, parent: ttk.Frame) -> None:
         
-        logo_img = load_logo_image(56)
-        if logo_img:
+        if self._logo_photo_56 is not None:
             logo_canvas = tk.Canvas(parent, width=56, height=56, highlightthickness=0, bg=self.colors["glass"], bd=0)
             logo_canvas.grid(row=0, column=0, rowspan=2, sticky="w", padx=(0, 12))
-            photo = ImageTk.PhotoImage(logo_img)
-            logo_canvas.create_image(0, 0, image=photo, anchor='nw')
-            logo_canvas._logo_photo = photo
+            logo_canvas.create_image(0, 0, image=self._logo_photo_56, anchor='nw')
         
         ttk.Label(parent, text="Telegram Export Studio", style="Header.TLabel").grid(row=0, column=1, sticky="w", columnspan=2)
         ttk.Label(parent, text="Подключите свои приватные каналы и архивируйте всё в один клик.", style="Caption.TLabel").grid(row=1, column=1, sticky="w", pady=(4, 0), columnspan=2)
@@ -848,48 +1130,22 @@ class App(tk.Tk):
         ttk.Label(card, text="Подключение", style="Title.TLabel").grid(row=0, column=0, sticky="w", pady=(0, 4))
         ttk.Label(card, text="Используйте ваши Telegram API данные для авторизации.", style="Info.TLabel").grid(row=1, column=0, sticky="w", pady=(0, 20))
 
-        # Keyboard layout fix: use keycode instead of keysym for Ctrl+V/C/X
-        def copy_paste_handler(e):
-            """Handle copy/paste/cut regardless of keyboard layout"""
-            if e.keycode == 86 and e.keysym != 'v':  # Ctrl+V
-                e.widget.event_generate('<<Paste>>')
-            elif e.keycode == 67 and e.keysym != 'c':  # Ctrl+C
-                e.widget.event_generate('<<Copy>>')
-            elif e.keycode == 88 and e.keysym != 'x':  # Ctrl+X
-                e.widget.event_generate('<<Cut>>')
-
-        # API ID (использует textvariable для автоматической синхронизации)
+        # Credentials live only in the Entry widgets until submit;
+        # _on_connect copies them into the SecureVars once
+        # API ID
         ttk.Label(card, text="API ID", style="Body.TLabel").grid(row=2, column=0, sticky="w", pady=(0, 6))
-        self.api_id_internal = tk.StringVar()
-        self.api_id_entry = ttk.Entry(card, show='•', textvariable=self.api_id_internal)
+        self.api_id_entry = ttk.Entry(card, show='•', exportselection=False, validate="none")
         self.api_id_entry.grid(row=3, column=0, sticky="ew", pady=(0, 16))
-        self.api_id_entry.bind("<Control-Key>", copy_paste_handler)
-        # Синхронизация с SecureVar при любом изменении
-        def sync_api_id(*_args):
-            self.api_id_var.set(self.api_id_internal.get())
-        self.api_id_internal.trace_add('write', sync_api_id)
 
-        # API Hash (использует textvariable для автоматической синхронизации)
+        # API Hash
         ttk.Label(card, text="API Hash", style="Body.TLabel").grid(row=4, column=0, sticky="w", pady=(0, 6))
-        self.api_hash_internal = tk.StringVar()
-        self.api_hash_entry = ttk.Entry(card, show='•', textvariable=self.api_hash_internal)
+        self.api_hash_entry = ttk.Entry(card, show='•', exportselection=False, validate="none")
         self.api_hash_entry.grid(row=5, column=0, sticky="ew", pady=(0, 16))
-        self.api_hash_entry.bind("<Control-Key>", copy_paste_handler)
-        # Синхронизация с SecureVar при любом изменении
-        def sync_api_hash(*_args):
-            self.api_hash_var.set(self.api_hash_internal.get())
-        self.api_hash_internal.trace_add('write', sync_api_hash)
 
-        # Phone (использует textvariable для автоматической синхронизации)
+        # Phone
         ttk.Label(card, text="Номер телефона", style="Body.TLabel").grid(row=6, column=0, sticky="w", pady=(0, 6))
-        self.phone_internal = tk.StringVar()
-        self.phone_entry = ttk.Entry(card, textvariable=self.phone_internal)
+        self.phone_entry = ttk.Entry(card)
         self.phone_entry.grid(row=7, column=0, sticky="ew", pady=(0, 16))
-        self.phone_entry.bind("<Control-Key>", copy_paste_handler)
-        # Синхронизация с SecureVar при любом изменении
-        def sync_phone(*_args):
-            self.phone_var.set(self.phone_internal.get())
-        self.phone_internal.trace_add('write', sync_phone)
 
         # Info message
         info_frame = ttk.Frame(card, style="CardInner.TFrame")
@@ -904,6 +1160,17 @@ class App(tk.Tk):
         self.connect_button = ttk.Button(card, text="Подключиться", style="Accent.TButton", command=self._on_connect)
         self.connect_button.grid(row=10, column=0, sticky="ew", pady=(0, 0))
 
+    @staticmethod
+    def _entry_clipboard_keys(e) -> None:
+        """Handle copy/paste/cut regardless of keyboard layout"""
+        # Keyboard layout fix: use keycode instead of keysym for Ctrl+V/C/X
+        if e.keycode == 86 and e.keysym != 'v':  # Ctrl+V
+            e.widget.event_generate('<<Paste>>')
+        elif e.keycode == 67 and e.keysym != 'c':  # Ctrl+C
+            e.widget.event_generate('<<Copy>>')
+        elif e.keycode == 88 and e.keysym != 'x':  # Ctrl+X
+            e.widget.event_generate('<<Cut>>')
+
     def _build_channel_card(self, parent: ttk.Frame) -> None:
         card = ttk.Frame(parent, style="Card.TFrame", padding=24)
         card.grid(row=0, column=2, sticky="nsew", padx=0)
@@ -933,13 +1200,16 @@ class App(tk.Tk):
             exportselection=False,
             borderwidth=0,
             highlightthickness=0,
-            font=("Segoe UI", 10),
+            font=_FONT_BASE,
             bg=self.colors["card"],
             fg=self.colors["text"],
             selectbackground=self.colors["accent"],
             selectforeground=self.colors["accent_contrast"],
         )
         self.dialog_list.grid(row=0, column=0, sticky="nsew")
+        # Raw Tcl handles for bulk refreshes in _apply_filter
+        self._dl_tk = self.dialog_list.tk
+        self._dl_path = str(self.dialog_list)
 
         ttk.Label(card, text="Подключенные чаты появятся здесь после авторизации.", style="Info.TLabel").grid(row=4, column=0, sticky="w", pady=(12, 0))
 
@@ -974,15 +1244,21 @@ class App(tk.Tk):
         buttons_row.columnconfigure(0, weight=1)
         buttons_row.columnconfigure(1, weight=1)
 
-        self.pause_button = ttk.Button(buttons_row, text="Пауза", style="Secondary.TButton", command=self._on_pause_resume)
-        self.pause_button.grid(row=0, column=0, sticky="ew", padx=(0, 4))
-        self.finish_button = ttk.Button(buttons_row, text="Завершить сейчас", style="Secondary.TButton", command=self._on_finish)
-        self.finish_button.grid(row=0, column=1, sticky="ew", padx=(4, 0))
+        self.pause_button = self._make_button(buttons_row, "Пауза", "Secondary.TButton", self._on_pause_resume, row=0, column=0, sticky="ew", padx=(0, 4))
+        self.finish_button = self._make_button(buttons_row, "Завершить сейчас", "Secondary.TButton", self._on_finish, row=0, column=1, sticky="ew", padx=(4, 0))
 
         self.pause_button.state(["disabled"])
         self.finish_button.state(["disabled"])
 
-        self.completion_frame = ttk.Frame(card, style="CardInner.TFrame")
+        # The completion view is only needed once an export finishes
+        self._export_card = card
+        self.completion_frame: Optional[ttk.Frame] = None
+
+    def _ensure_completion_frame(self) -> ttk.Frame:
+        """Build the completion view on first use"""
+        if self.completion_frame is not None:
+            return self.completion_frame
+        self.completion_frame = ttk.Frame(self._export_card, style="CardInner.TFrame")
         self.completion_frame.columnconfigure(0, weight=1)
         self.completion_frame.grid(row=7, column=0, sticky="ew", pady=(24, 0))
         self.completion_title_var = tk.StringVar(value="Экспорт завершен")
@@ -991,18 +1267,24 @@ class App(tk.Tk):
         ttk.Label(self.completion_frame, text="Ваш архив готов.", style="Info.TLabel").grid(row=2, column=0)
         completion_buttons = ttk.Frame(self.completion_frame, style="CardInner.TFrame")
         completion_buttons.grid(row=3, column=0, pady=(16, 0))
-        completion_buttons.columnconfigure(0, weight=1)
-        completion_buttons.columnconfigure(1, weight=1)
-        completion_buttons.columnconfigure(2, weight=1)
-        self.open_folder_button = ttk.Button(completion_buttons, text="Открыть папку", style="Accent.TButton", command=self._open_last_export)
-        self.open_folder_button.grid(row=0, column=0, padx=(0, 8))
-        self.open_html_button = ttk.Button(completion_buttons, text="Открыть HTML", style="Accent.TButton", command=self._open_index_html)
-        self.open_html_button.grid(row=0, column=1, padx=(0, 8))
-        self.export_again_button = ttk.Button(completion_buttons, text="Экспортировать снова", style="Ghost.TButton", command=self._reset_after_completion)
-        self.export_again_button.grid(row=0, column=2)
+        completion_specs = (
+            ("open_folder_button", "Открыть папку", "Accent.TButton", self._open_last_export, (0, 8)),
+            ("open_html_button", "Открыть HTML", "Accent.TButton", self._open_index_html, (0, 8)),
+            ("export_again_button", "Экспортировать снова", "Ghost.TButton", self._reset_after_completion, 0),
+        )
+        for column, (attr, text, style, command, padx) in enumerate(completion_specs):
+            completion_buttons.columnconfigure(column, weight=1)
+            setattr(self, attr, self._make_button(completion_buttons, text, style, command, row=0, column=column, padx=padx))
         self.open_folder_button.state(["disabled"])
         self.open_html_button.state(["disabled"])
-        self.completion_frame.grid_remove()
+        return self.completion_frame
+
+    @staticmethod
+    def _make_button(parent: ttk.Frame, text: str, style: str, command, **grid: Any) -> ttk.Button:
+        """Create a ttk.Button and grid it in one call"""
+        button = ttk.Button(parent, text=text, style=style, command=command)
+        button.grid(**grid)
+        return button
 
     def _build_logs_card(self) -> None:
         card = ttk.Frame(self, style="Card.TFrame", padding=24)
@@ -1040,102 +1322,188 @@ class App(tk.Tk):
 # gui_app.py - PART 3 (App class methods continuation)
 # Add these methods to the App class from Part 2
 
-    def _apply_filter(self) -> None:
+    def _schedule_filter(self, *_: Any) -> None:
+        """Debounce search typing: filter once the input settles"""
+        if self._filter_after_id is not None:
+            self.after_cancel(self._filter_after_id)
+        self._filter_after_id = self.after(SEARCH_DEBOUNCE_MS, self._run_scheduled_filter)
+
+    def _run_scheduled_filter(self) -> None:
+        self._filter_after_id = None
+        self._apply_filter()
+
+    def _apply_filter(self, force: bool = False) -> None:
         query = self.search_var.get().strip().lower()
-        self.dialog_list.delete(0, tk.END)
-        self.filtered_indices.clear()
-        icon_map = {"channel": "[CH]", "group": "[GR]", "user": "[DM]"}
-        
-        for item in self.all_dialogs:
-            title = item.get("title", "")
-            if query and query not in title.lower():
-                continue
-            icon = icon_map.get(item.get('kind'), '•')
-            
-            # Sanitize title for display
-            display_title = title[:100] if len(title) > 100 else title
-            entry = f"{icon}  {display_title}"
-            
-            self.dialog_list.insert(tk.END, entry)
-            self.filtered_indices.append(item["index"])
+
+        # Typing more characters can only narrow the result: search the
+        # previous matches instead of every dialog
+        titles_lc = self._dialog_titles_lc
+        prev_query = self._filter_query
+        if not force and prev_query is not None and query.startswith(prev_query):
+            keep = self._filter_matches
+            if query:
+                keep = [i for i in keep if query in titles_lc[i]]
+        elif query:
+            keep = [i for i, title_lc in enumerate(titles_lc) if query in title_lc]
+        else:
+            keep = range(len(titles_lc))
+        self._filter_query = query
+        self._filter_matches = keep
+        indices = self._dialog_indices
+        new_indices = [indices[i] for i in keep]
+
+        # Same rows as shown already: keep the listbox (and its selection) as is
+        if not force and new_indices == self.filtered_indices:
+            return
+
+        display = self._dialog_display
+        entries = [display[i] for i in keep]
+        self.filtered_indices = new_indices
+
+        # One Tcl round-trip each for clearing and refilling the listbox
+        self._dl_tk.call(self._dl_path, "delete", 0, "end")
+        if entries:
+            self._dl_tk.call(self._dl_path, "insert", "end", *entries)
         
         self._on_channel_select()
         self._update_export_controls()
 
     def _append_log(self, message: str) -> None:
-        timestamp = time.strftime("%H:%M:%S")
-        
-        # Sanitize log message (limit length)
-        if len(message) > 500:
-            message = message[:497] + "..."
+        self._append_logs((message,))
+
+    def _append_logs(self, messages) -> None:
+        """Insert a batch of log lines with a single Text.insert call"""
+        timestamp = f"[{time.strftime('%H:%M:%S')}] "
+        args: list[Any] = []
+        lines = 0
+        for message in messages:
+            # Sanitize log message (limit length)
+            if len(message) > 500:
+                message = message[:497] + "..."
+            args += (timestamp, ("timestamp",), f"{message}\n", ("message",))
+            lines += 1 + message.count("\n")
+        if not args:
+            return
         
         self.log_text.configure(state="normal")
-        self.log_text.insert("end", f"[{timestamp}] ", ("timestamp",))
-        self.log_text.insert("end", f"{message}\n", ("message",))
+        self.log_text.insert("end", *args)
+        # Ring buffer: drop the oldest lines once the log exceeds the cap.
+        # Lines are counted here rather than asking Tk for the end index.
+        self._log_line_count += lines
+        if self._log_line_count > LOG_MAX_LINES:
+            self.log_text.delete("1.0", f"{self._log_line_count - LOG_MAX_LINES + 1}.0")
+            self._log_line_count = LOG_MAX_LINES
         self.log_text.see("end")
         self.log_text.configure(state="disabled")
 
     def _process_events(self) -> None:
-        while True:
+        """Poll the wakeup flag; drain only when the worker queued events"""
+        if self.ui_wakeup.is_set():
+            self._drain_events()
+        self.after(UI_POLL_MS, self._process_events)
+
+    def _drain_events(self) -> None:
+        # Fast path: log, status and progress events dominate a running
+        # export, so they skip the full dispatcher. Logs are inserted in one
+        # batch and only the latest status / per-channel progress is applied;
+        # logs and status are flushed before any other event to keep ordering.
+        pending_logs: list[str] = []
+        latest_status: Optional[dict[str, Any]] = None
+        # Latest progress per channel (multi-dialog exports interleave)
+        latest_progress: dict[Any, dict[str, Any]] = {}
+        handled = 0
+        self.ui_wakeup.clear()
+        while handled < UI_EVENTS_PER_TICK:
             try:
-                event = self.ui_queue.get_nowait()
-            except queue.Empty:
+                etype, event = self.ui_queue.popleft()
+            except IndexError:
                 break
-            self._handle_event(event)
-        self.after(120, self._process_events)
+            handled += 1
+            if etype == "log":
+                msg = event.get("message")
+                if msg:
+                    pending_logs.append(msg)
+                continue
+            if etype == "status":
+                latest_status = event
+                continue
+            if etype == "progress":
+                latest_progress[event.get("channel")] = event
+                continue
+            if pending_logs:
+                self._append_logs(pending_logs)
+                pending_logs.clear()
+            if latest_status is not None:
+                self._handle_event("status", latest_status)
+                latest_status = None
+            self._handle_event(etype, event)
+
+        if pending_logs:
+            self._append_logs(pending_logs)
+        if latest_status is not None:
+            self._handle_event("status", latest_status)
+        for event in latest_progress.values():
+            self._handle_event("progress", event)
+        # Per-tick limit hit: re-arm the flag so the next poll tick
+        # finishes the backlog without starving Tk
+        if handled >= UI_EVENTS_PER_TICK:
+            self.ui_wakeup.set()
+
+    def _handle_event(self, etype: str, event: dict[str, Any]) -> None:
+        handler = self._event_dispatch.get(etype)
+        if handler is not None:
+            handler(event)
+
+    def _ev_log(self, event: dict[str, Any]) -> None:
+        msg = event.get("message")
+        if msg:
+            self._append_log(msg)
+
+    def _ev_error(self, event: dict[str, Any]) -> None:
+        msg = event.get("message", "Неожиданная ошибка")
+        self._append_log(f"[Ошибка] {msg}")
+        messagebox.showerror("Ошибка", msg[:200], parent=self)  # Limit error message length
+        self.status_var.set("Ошибка")
+        self.export_running = False
+        self.export_paused = False
+        self._set_progress_running(False)
+        self._show_controls_view()
+        self._update_export_controls()
 
-    def _handle_event(self, event: dict[str, Any]) -> None:
-        etype = event.get("type")
-        
-        if etype == "log":
-            msg = event.get("message")
-            if msg:
-                self._append_log(msg)
-        
-        elif etype == "error":
-            msg = event.get("message", "Неожиданная ошибка")
-            self._append_log(f"[Ошибка] {msg}")
-            messagebox.showerror("Ошибка", msg[:200], parent=self)  # Limit error message length
-            self.status_var.set("Ошибка")
-            self.export_running = False
-            self.export_paused = False
-            self._set_progress_running(False)
-            self._show_controls_view()
-            self._update_export_controls()
-
-        elif etype == "dialogs":
-            self.all_dialogs = event.get("items", [])
-            self._apply_filter()
-
-        elif etype == "progress":
-            count = event.get("count", 0)
-            channel = event.get("channel") or "Канал"
-            # Sanitize channel name
-            safe_channel = channel[:50] if len(channel) > 50 else channel
-            self.stats_var.set(f"{safe_channel}: {count} сообщений сохранено")
-
-        elif etype == "export_done":
-            self._last_export_info = event
-            html = event.get("html_path")
-            channel = event.get("channel") or "Канал"
-            if html:
-                self.last_export_html = html
-                self.last_export_dir = os.path.dirname(html)
-            self._append_log(f"[Готово] {channel[:50]} -> {html}")
-        
-        elif etype == "status":
-            message = event.get("message", "")
-            if message:
-                # Limit status message length
-                if len(message) > 100:
-                    message = message[:97] + "..."
-                self.status_var.set(message)
-        
-        elif etype == "export_state":
-            self._handle_export_state(event.get("state"))
-        
-        elif etype == "input_request":
-            self._handle_input_request(event)
+    def _ev_dialogs(self, event: dict[str, Any]) -> None:
+        self.all_dialogs = event.get("items", [])
+        # Lowercased title and listbox row are computed once per refresh
+        icon_for = _DIALOG_ICONS.get
+        dialogs = self.all_dialogs
+        self._dialog_by_index = {item["index"]: item for item in dialogs}
+        self._dialog_indices = [item["index"] for item in dialogs]
+        self._dialog_display = [
+            f"{icon_for(item.get('kind'), '•')}  {item.get('title', '')[:100]}" for item in dialogs
+        ]
+        self._dialog_titles_lc = [(item.get("title") or "").lower() for item in dialogs]
+        self._apply_filter(force=True)
+
+    def _ev_progress(self, event: dict[str, Any]) -> None:
+        count = event.get("count", 0)
+        channel = event.get("channel") or "Канал"
+        self.stats_var.set(f"{channel}: {count} сообщений сохранено")
+
+    def _ev_export_done(self, event: dict[str, Any]) -> None:
+        self._last_export_info = event
+        html = event.get("html_path")
+        channel = event.get("channel") or "Канал"
+        if html:
+            self.last_export_html = html
+            self.last_export_dir = os.path.dirname(html)
+        self._append_log(f"[Готово] {channel} -> {html}")
+
+    def _ev_status(self, event: dict[str, Any]) -> None:
+        message = event.get("message", "")
+        if message:
+            self.status_var.set(message)
+
+    def _ev_export_state(self, event: dict[str, Any]) -> None:
+        self._handle_export_state(event.get("state"))
 
     def _handle_export_state(self, state: Optional[str]) -> None:
         if state == "running":
@@ -1154,7 +1522,6 @@ class App(tk.Tk):
         
         elif state == "finish_requested":
             self.export_finishing = True
-            self.finish_button.state(["disabled"])
         
         elif state == "cancelled":
             self.export_finishing = False
@@ -1180,84 +1547,149 @@ class App(tk.Tk):
         
         self._update_export_controls()
 
+    def _queue_input_request(self, event: dict[str, Any]) -> None:
+        # The modal prompt spins a nested event loop (wait_variable); running
+        # it inside _drain_events would let a nested drain apply newer events
+        # before the outer one finishes with older ones
+        self._input_requests.append(event)
+        if not self._input_active:
+            self._input_active = True
+            self.after_idle(self._process_input_requests)
+
+    def _process_input_requests(self) -> None:
+        # Requests arriving while a prompt is open are picked up here in turn,
+        # so prompts never nest on the shared Toplevel
+        try:
+            while self._input_requests:
+                self._handle_input_request(self._input_requests.popleft())
+        finally:
+            self._input_active = False
+
     def _handle_input_request(self, event: dict[str, Any]) -> None:
         prompt = event.get("prompt") or "Введите значение"
         title = event.get("title") or "Ввод"
         secret = bool(event.get("secret"))
-        fut = event.get("future")
+        answer = event.get("answer")
         
         value = self._show_input_dialog(title=title, prompt=prompt, secret=secret)
         
-        if fut is not None:
-            self.worker.resolve_future(fut, value)
+        if answer is not None:
+            self.worker.resolve_input(answer, value)
 
     def _show_input_dialog(self, title: str, prompt: str, secret: bool = False) -> Optional[str]:
-        if Image is None or pystray is None:
+        if _tray_support()[0] is None:
             return simpledialog.askstring(title, prompt, show='•' if secret else '', parent=self)
         
-        top = tk.Toplevel(self)
+        dialog = self._input_dialog or self._build_input_dialog()
+        top = dialog['top']
+        entry = dialog['entry']
+
         top.title(title)
+        # Sanitize prompt (limit length)
+        prompt = prompt[:200]
+        relayout = dialog['prompt'].cget('text') != prompt
+        if relayout:
+            dialog['prompt'].configure(text=prompt)
+        dialog['value_var'].set('')
+        entry.configure(show='•' if secret else '')
+        dialog['result'] = None
+
+        top.deiconify()
+        self._center_modal(top, relayout=relayout)
+        top.grab_set()
+        entry.focus_set()
+
+        dialog['done_var'].set(0)
+        top.wait_variable(dialog['done_var'])
+        return dialog['result']
+
+    def _build_input_dialog(self) -> dict[str, Any]:
+        """Build the input prompt once; later prompts reuse the hidden window"""
+        top = tk.Toplevel(self)
+        top.withdraw()
         top.configure(bg=self.colors['window'])
         top.transient(self)
-        top.grab_set()
         top.resizable(False, False)
 
         frame = ttk.Frame(top, style='Card.TFrame', padding=20)
         frame.grid(row=0, column=0, sticky='nsew')
 
-        # Sanitize prompt (limit length)
-        safe_prompt = prompt[:200] if len(prompt) > 200 else prompt
-        ttk.Label(frame, text=safe_prompt, style='Body.TLabel').grid(row=0, column=0, sticky='w')
+        prompt_label = ttk.Label(frame, style='Body.TLabel')
+        prompt_label.grid(row=0, column=0, sticky='w')
         
         value_var = tk.StringVar()
-        entry = ttk.Entry(frame, textvariable=value_var, show='•' if secret else '')
+        entry = ttk.Entry(frame, textvariable=value_var)
         entry.grid(row=1, column=0, sticky='ew', pady=(8, 16))
-        entry.focus_set()
 
         button_row = ttk.Frame(frame, style='CardInner.TFrame')
         button_row.grid(row=2, column=0, sticky='ew')
         button_row.columnconfigure(0, weight=1)
         button_row.columnconfigure(1, weight=1)
 
-        result: dict[str, Optional[str]] = {'value': None}
+        dialog: dict[str, Any] = {
+            'top': top,
+            'prompt': prompt_label,
+            'entry': entry,
+            'value_var': value_var,
+            'done_var': tk.IntVar(top, value=0),
+            'result': None,
+        }
+
+        def close(value: Optional[str]) -> None:
+            dialog['result'] = value
+            value_var.set('')  # Don't keep codes/passwords in the widget
+            top.grab_release()
+            top.withdraw()
+            dialog['done_var'].set(1)
 
         def submit() -> None:
-            result['value'] = value_var.get().strip() or None
-            top.destroy()
+            close(value_var.get().strip() or None)
 
         def cancel() -> None:
-            result['value'] = None
-            top.destroy()
+            close(None)
 
         ttk.Button(button_row, text='Отмена', style='Secondary.TButton', command=cancel).grid(row=0, column=0, sticky='ew', padx=(0, 12))
         ttk.Button(button_row, text='ОК', style='Accent.TButton', command=submit).grid(row=0, column=1, sticky='ew')
 
         top.bind('<Return>', lambda _: submit())
         top.bind('<Escape>', lambda _: cancel())
-
-        self._center_modal(top)
-        top.wait_window()
-        return result.get('value')
-
-    def _center_modal(self, window: tk.Toplevel) -> None:
-        window.update_idletasks()
-        w = window.winfo_width()
-        h = window.winfo_height()
-        parent_w = self.winfo_width()
-        parent_h = self.winfo_height()
-        parent_x = self.winfo_rootx()
-        parent_y = self.winfo_rooty()
+        top.protocol('WM_DELETE_WINDOW', cancel)
+
+        self._input_dialog = dialog
+        return dialog
+
+    def _on_root_configure(self, event) -> None:
+        # <Configure> on the root also fires for every child widget
+        if event.widget is self:
+            self._parent_geom = (event.width, event.height, self.winfo_rootx(), self.winfo_rooty())
+
+    def _center_modal(self, window: tk.Toplevel, relayout: bool = False) -> None:
+        # Requested size is known without a layout pass once the window
+        # has been laid out; a brand-new window or changed content is only
+        # measured after update_idletasks
+        w = window.winfo_reqwidth()
+        h = window.winfo_reqheight()
+        if relayout or w <= 1 or h <= 1:
+            window.update_idletasks()
+            w = window.winfo_reqwidth()
+            h = window.winfo_reqheight()
+        if self._parent_geom is not None:
+            parent_w, parent_h, parent_x, parent_y = self._parent_geom
+        else:
+            parent_w = self.winfo_width()
+            parent_h = self.winfo_height()
+            parent_x = self.winfo_rootx()
+            parent_y = self.winfo_rooty()
         x = parent_x + max((parent_w - w) // 2, 0)
         y = parent_y + max((parent_h - h) // 2, 0)
-        window.geometry('{}x{}+{}+{}'.format(w, h, x, y))
+        # Position only, so Tk keeps sizing the window to its content
+        window.geometry('+{}+{}'.format(x, y))
     
     def _create_tray_image(self):
-        if Image is None:
-            return None
-        tray_img = create_tray_icon(64)
-        return tray_img if tray_img else Image.new('RGBA', (64, 64), (0, 0, 0, 0))
+        return _make_tray_image(64)
 
     def _start_tray_icon(self) -> None:
+        pystray, _ = _tray_support()
         if self._tray_active or pystray is None:
             return
         image = self._create_tray_image()
@@ -1303,7 +1735,7 @@ class App(tk.Tk):
         self.focus_force()
 
     def _minimize_to_tray(self) -> None:
-        if pystray is None or Image is None or ImageDraw is None:
+        if _tray_support()[0] is None:
             messagebox.showinfo('Трей недоступен', 'Требуются pystray и Pillow для режима трея. Сворачиваю в панель задач.', parent=self)
             self.iconify()
             self.status_var.set('Свернуто в панель задач (трей отключен)')
@@ -1337,14 +1769,36 @@ class App(tk.Tk):
         except Exception:
             pass
 
-        self.after(200, self.destroy)
+        # Destroy as soon as the worker has wiped the sessions, but never
+        # hang the quit on a stuck disconnect
+        self._exit_deadline = time.monotonic() + EXIT_WAIT_MAX
+        self.after_idle(self._finalize_destroy)
+
+    def _finalize_destroy(self) -> None:
+        if self.worker.is_stopped() or time.monotonic() >= self._exit_deadline:
+            self.destroy()
+        else:
+            self.after(EXIT_POLL_MS, self._finalize_destroy)
+
+    def _on_root_visibility(self, event, visible: bool) -> None:
+        # Map/Unmap bound on the root also fire for every child widget
+        if event.widget is not self or visible == self._window_visible:
+            return
+        self._window_visible = visible
+        # No point redrawing the indeterminate bar every 12 ms while hidden
+        if self.progress_animating:
+            if visible:
+                self.progress_bar.start(12)
+            else:
+                self.progress_bar.stop()
 
     def _set_progress_running(self, running: bool) -> None:
         if running:
             self.progress_bar.configure(mode="indeterminate")
             if not self.progress_animating:
-                self.progress_bar.start(12)
                 self.progress_animating = True
+                if self._window_visible:
+                    self.progress_bar.start(12)
         else:
             if self.progress_animating:
                 self.progress_bar.stop()
@@ -1353,13 +1807,14 @@ class App(tk.Tk):
             self.progress_bar["value"] = 0
 
     def _show_completion_view(self, info: Optional[dict[str, Any]] = None) -> None:
+        self._ensure_completion_frame()
         info = info or {}
         channel = info.get("channel") or "Экспорт завершен"
         # Sanitize channel name
         safe_channel = channel[:50] if len(channel) > 50 else channel
         self.completion_title_var.set(f"{safe_channel} экспортирован")
 
-        if self.last_export_dir and os.path.isdir(self.last_export_dir):
+        if self.last_export_dir and self._cached_isdir(self.last_export_dir):
             self.open_folder_button.state(["!disabled"])
             self.open_html_button.state(["!disabled"])
         else:
@@ -1370,31 +1825,48 @@ class App(tk.Tk):
         self.completion_frame.grid()
 
     def _show_controls_view(self) -> None:
-        self.completion_frame.grid_remove()
         self.export_controls_frame.grid()
+        if self.completion_frame is None:
+            return
+        self.completion_frame.grid_remove()
         self.open_folder_button.state(["disabled"])
         self.open_html_button.state(["disabled"])
 
     def _update_export_controls(self) -> None:
         if self.export_running:
-            self.start_button.state(["disabled"])
-            self.pause_button.state(["!disabled"])
-            if self.export_finishing:
-                self.finish_button.state(["disabled"])
-            else:
-                self.finish_button.state(["!disabled"])
-            self.pause_button.configure(text="Продолжить" if self.export_paused else "Пауза")
+            start = False
+            pause = True
+            finish = not self.export_finishing
+            pause_text = "Продолжить" if self.export_paused else "Пауза"
         else:
-            selection = bool(self.dialog_list.curselection())
-            if selection:
-                self.start_button.state(["!disabled"])
-            else:
-                self.start_button.state(["disabled"])
-            self.pause_button.state(["disabled"])
-            self.finish_button.state(["disabled"])
-            self.pause_button.configure(text="Пауза")
+            start = bool(self.dialog_list.curselection())
+            pause = finish = False
+            pause_text = "Пауза"
+        # Connecting or refreshing would swap the client/dialogs under an export
+        session = not self.export_running
+        # Only touch the widgets whose state actually changed
+        desired = (start, pause, finish, session, pause_text)
+        last = self._export_controls_state
+        if desired == last:
+            return
+        for index, button in enumerate((self.start_button, self.pause_button, self.finish_button)):
+            if last is None or last[index] != desired[index]:
+                button.state(["!disabled"] if desired[index] else ["disabled"])
+        if last is None or last[3] != session:
+            for button in (self.connect_button, self.refresh_button):
+                button.state(["!disabled"] if session else ["disabled"])
+        if last is None or last[4] != pause_text:
+            self.pause_button.configure(text=pause_text)
+        self._export_controls_state = desired
 
     def _on_connect(self) -> None:
+        if self.export_running:
+            return
+        # Read the entries once at submit
+        self.api_id_var.set(self.api_id_entry.get())
+        self.api_hash_var.set(self.api_hash_entry.get())
+        self.phone_var.set(self.phone_entry.get())
+
         # Get and validate API ID
         api_id_str = self.api_id_var.get().strip()
         if not api_id_str:
@@ -1430,12 +1902,8 @@ class App(tk.Tk):
             messagebox.showerror("Ошибка", "Номер телефона обязателен", parent=self)
             return
 
-        if not phone.startswith('+'):
-            messagebox.showerror("Ошибка", "Номер телефона должен начинаться с + (например +1234567890)", parent=self)
-            return
-
-        if not phone[1:].replace(' ', '').isdigit():
-            messagebox.showerror("Ошибка", "Номер телефона должен содержать только цифры после +", parent=self)
+        if not _PHONE_RE.match(phone):
+            messagebox.showerror("Ошибка", "Номер телефона должен начинаться с + и содержать только цифры (например +1234567890)", parent=self)
             return
 
         self.status_var.set("Подключение...")
@@ -1448,6 +1916,8 @@ class App(tk.Tk):
         )
 
     def _on_refresh(self) -> None:
+        if self.export_running:
+            return
         self.worker.send_command("refresh_dialogs")
 
     def _on_export(self) -> None:
@@ -1511,58 +1981,87 @@ class App(tk.Tk):
         if self.worker.request_finish():
             self.finish_button.state(["disabled"])
             self.pause_button.state(["disabled"])
+            # Buttons were changed behind the cache; next update reapplies all
+            self._export_controls_state = None
+
+    def _cached_stat(self, path: str) -> Optional[os.stat_result]:
+        now = time.monotonic()
+        hit = self._stat_cache.get(path)
+        if hit is not None and now - hit[0] < STAT_CACHE_TTL:
+            return hit[1]
+        try:
+            st: Optional[os.stat_result] = os.stat(path)
+        except OSError:
+            st = None
+        self._stat_cache[path] = (now, st)
+        return st
+
+    def _cached_isdir(self, path: str) -> bool:
+        st = self._cached_stat(path)
+        return st is not None and stat.S_ISDIR(st.st_mode)
+
+    def _cached_isfile(self, path: str) -> bool:
+        st = self._cached_stat(path)
+        return st is not None and stat.S_ISREG(st.st_mode)
+
+    def _is_inside_export_root(self, path: str) -> bool:
+        """Check path (after resolving symlinks) lies within the export directory"""
+        target = os.path.realpath(path)
+        # commonpath compares whole components: "export-evil" is not inside "export"
+        try:
+            return os.path.commonpath([target, self._export_root]) == self._export_root
+        except ValueError:  # Different drives on Windows
+            return False
+
+    @staticmethod
+    def _open_with_system(path: str) -> None:
+        """Open a file or folder with the platform's default handler"""
+        if sys.platform.startswith("win"):
+            os.startfile(path)
+            return
+        # CPython only takes the posix_spawn path (instead of fork+exec) for
+        # an absolute executable, close_fds=False and no new session
+        subprocess.Popen(
+            [_system_opener(), path],
+            close_fds=False,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
 
     def _open_last_export(self) -> None:
-        if not self.last_export_dir or not os.path.isdir(self.last_export_dir):
+        if not self.last_export_dir or not self._cached_isdir(self.last_export_dir):
             messagebox.showinfo("Открыть папку", "Директория экспорта пока недоступна.", parent=self)
             return
 
         # SECURITY: Validate path before opening
         try:
-            # Check if path is within expected export directory
-            export_root = os.path.abspath("export")
-            target_path = os.path.abspath(self.last_export_dir)
-
-            if not target_path.startswith(export_root):
+            if not self._is_inside_export_root(self.last_export_dir):
                 messagebox.showerror("Ошибка безопасности", "Неверный путь экспорта", parent=self)
                 return
 
-            if sys.platform.startswith("win"):
-                os.startfile(self.last_export_dir)
-            elif sys.platform == "darwin":
-                subprocess.Popen(["open", self.last_export_dir])
-            else:
-                subprocess.Popen(["xdg-open", self.last_export_dir])
+            self._open_with_system(self.last_export_dir)
 
         except Exception as exc:
             messagebox.showerror("Открыть папку", f"Не удалось открыть папку: {exc}", parent=self)
 
     def _open_index_html(self) -> None:
-        if not self.last_export_dir or not os.path.isdir(self.last_export_dir):
+        if not self.last_export_dir or not self._cached_isdir(self.last_export_dir):
             messagebox.showinfo("Открыть HTML", "Директория экспорта пока недоступна.", parent=self)
             return
 
         index_html_path = os.path.join(self.last_export_dir, "index.html")
-        if not os.path.isfile(index_html_path):
+        if not self._cached_isfile(index_html_path):
             messagebox.showerror("Ошибка", "Файл index.html не найден", parent=self)
             return
 
         # SECURITY: Validate path before opening
         try:
-            # Check if path is within expected export directory
-            export_root = os.path.abspath("export")
-            target_path = os.path.abspath(index_html_path)
-
-            if not target_path.startswith(export_root):
+            if not self._is_inside_export_root(index_html_path):
                 messagebox.showerror("Ошибка безопасности", "Неверный путь экспорта", parent=self)
                 return
 
-            if sys.platform.startswith("win"):
-                os.startfile(index_html_path)
-            elif sys.platform == "darwin":
-                subprocess.Popen(["open", index_html_path])
-            else:
-                subprocess.Popen(["xdg-open", index_html_path])
+            self._open_with_system(index_html_path)
 
         except Exception as exc:
             messagebox.showerror("Открыть HTML", f"Не удалось открыть файл: {exc}", parent=self)
@@ -1571,6 +2070,7 @@ class App(tk.Tk):
         self._last_export_info = None
         self.last_export_html = None
         self.last_export_dir = None
+        self._stat_cache.clear()
         self.stats_var.set("Сообщений сохранено: 0")
         self.status_var.set("Готов")
         self._show_controls_view()
@@ -1585,7 +2085,7 @@ class App(tk.Tk):
                 self.channel_title_var.set("Каналы недоступны")
         else:
             idx = self.filtered_indices[selection[0]]
-            match = next((d for d in self.all_dialogs if d.get("index") == idx), None)
+            match = self._dialog_by_index.get(idx)
             if match:
                 title = match.get("title") or "Канал"
                 # Sanitize title for display
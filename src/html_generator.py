@@ -1,10 +1,27 @@
 # html_generator.py - SECURED VERSION
+import functools
 import os
 import json
-import html
 import re
-from datetime import datetime
-from typing import Optional, Union
+from datetime import date, datetime
+from collections import defaultdict
+from itertools import count, groupby
+from typing import Iterable, Iterator, Optional, Union
+
+try:
+    import orjson  # Optional: fast C JSON parser
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # Optional: incremental parsing of large exports
+except ImportError:
+    ijson = None
+
+try:
+    from markupsafe import escape as _markup_escape  # Optional: C-accelerated escaping
+except ImportError:
+    _markup_escape = None
 
 # ═══════════════════════════════════════════════════
 # SECURITY: STRICT CSP (NO UNSAFE-INLINE)
@@ -22,21 +39,26 @@ _CSP_META = (
     "frame-ancestors 'none'; "
     "connect-src 'none'\">"
 )
+_CSP_META_BYTES = _CSP_META.encode("ascii")
 
-_BASE_TEMPLATE = """<!DOCTYPE html>
+# The page is streamed: head, then one block per day/message, then tail.
+# Static chunks are encoded once; only the title, CSP and refresh meta vary
+_HEAD_START = b"""<!DOCTYPE html>
 <html lang="ru">
 <head>
 <meta charset="UTF-8">
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>{title}</title>
-{csp}{auto_refresh}
+<title>"""
+_HEAD_TITLE_END = b"</title>\n"
+_HEAD_BODY = b"""
 <link rel="stylesheet" href="styles.css">
 </head>
 <body>
-  <div class="topbar">{title_escaped}</div>
+  <div class="topbar">"""
+_HEAD_END = b"""</div>
   <div class="container">
-    {content}
-  </div>
+"""
+_TAIL = b"""  </div>
 </body>
 </html>"""
 
@@ -203,41 +225,84 @@ a[href^="data:text/html"] {
   text-decoration: line-through;
 }
 """
+_EXTERNAL_CSS_BYTES = _EXTERNAL_CSS.encode("utf-8")
 
 # ═══════════════════════════════════════════════════
 # SECURITY: ENHANCED HTML ESCAPING
 # ═══════════════════════════════════════════════════
+# Same entities as html.escape(quote=True)
+_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+})
+
+
+# Text nodes never need quote escaping
+_ESCAPE_TEXT_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+})
+
+
+# Attribute values (file names, paths, titles) repeat heavily within an
+# export; the caches live for the process, which is fine for these sizes
+@functools.lru_cache(maxsize=8192)
 def _escape(s: str) -> str:
     """
     Enhanced HTML escaping with protection against:
     - Standard HTML entities
     - Unicode normalization attacks
     - Control characters
+
+    Safe for attribute values; use _escape_text for element content.
     """
     if not s:
         return ""
     
-    # Use html.escape for standard escaping
-    s = html.escape(s, quote=True)
-    
-    # Remove/escape control characters (except common whitespace)
-    s = ''.join(c if c in '\n\r\t' or ord(c) >= 32 else f'&#x{ord(c):02x};' for c in s)
-    
-    # Protect against Unicode lookalike attacks (homograph attacks)
-    # This is a simplified version - full protection would need Unicode normalization
-    dangerous_unicode = {
-        '\u200b': '',  # Zero-width space
-        '\u200c': '',  # Zero-width non-joiner
-        '\u200d': '',  # Zero-width joiner
-        '\u2060': '',  # Word joiner
-        '\ufeff': '',  # Zero-width no-break space
-    }
-    for char, replacement in dangerous_unicode.items():
-        s = s.replace(char, replacement)
-    
-    return s
+    # Standard entities in a single C-level pass
+    if _markup_escape is not None:
+        return _scrub(str(_markup_escape(s)))
+    return _scrub(s.translate(_ESCAPE_TABLE))
+
+
+def _escape_text(s: str) -> str:
+    """Escape text node content (& < > only, quotes are harmless there)"""
+    if not s:
+        return ""
+    return _scrub(s.translate(_ESCAPE_TEXT_TABLE))
+
+
+@functools.lru_cache(maxsize=4096)
+def _escape_label(s: str) -> str:
+    """_escape_text for short, repeating text (author names, HH:MM times)"""
+    return _escape_text(s)
+
+
+# Control characters (except \t \n \r) are escaped; zero-width characters
+# are dropped (simplified homograph protection, no Unicode normalization)
+_ZERO_WIDTH = frozenset('\u200b\u200c\u200d\u2060\ufeff')
+_SCRUB_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\u200b-\u200d\u2060\ufeff]')
+
+
+def _scrub_repl(m: "re.Match[str]") -> str:
+    c = m.group()
+    return '' if c in _ZERO_WIDTH else f'&#x{ord(c):02x};'
+
+
+def _scrub(s: str) -> str:
+    """Escape control characters and drop zero-width characters"""
+    # One C-level regex scan instead of a per-character Python loop
+    return _SCRUB_RE.sub(_scrub_repl, s)
 
 
+_DANGEROUS_PROTO_RE = re.compile(r'(?:javascript|data|vbscript|file|about):', re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=4096)
 def _sanitize_url(url: str) -> str:
     """Sanitize URL to prevent XSS"""
     if not url:
@@ -246,64 +311,78 @@ def _sanitize_url(url: str) -> str:
     url = url.strip()
     
     # Block dangerous protocols
-    dangerous_protocols = ['javascript:', 'data:', 'vbscript:', 'file:', 'about:']
-    url_lower = url.lower()
-    
-    for protocol in dangerous_protocols:
-        if url_lower.startswith(protocol):
-            return "#blocked-url"
+    if _DANGEROUS_PROTO_RE.match(url):
+        return "#blocked-url"
     
     # Only allow http(s) and relative paths
-    if not (url.startswith('http://') or url.startswith('https://') or url.startswith('./')):
+    if not url.startswith(('http://', 'https://', './')):
         # Assume relative path
         url = './' + url
     
     return _escape(url)
 
 
-def _group_by_day(messages):
-    """Group messages by day"""
-    grouped = []
-    current_day = None
-    bucket = []
-    
-    for m in messages:
-        try:
-            dt = datetime.strptime(m["date"], "%Y-%m-%d %H:%M:%S") if m.get("date") else None
-        except Exception:
-            dt = None
-        
-        day = dt.strftime("%Y-%m-%d") if dt else "unknown"
-        
-        if current_day is None:
-            current_day = day
-        
-        if day != current_day:
-            grouped.append((current_day, bucket))
-            bucket = []
-            current_day = day
-        
-        bucket.append(m)
-    
-    if bucket:
-        grouped.append((current_day, bucket))
-    
-    return grouped
+def _parse_dt(value) -> Optional[datetime]:
+    """
+    Parse an exported "%Y-%m-%d %H:%M:%S" timestamp.
+
+    datetime.fromisoformat is implemented in C and much cheaper than
+    strptime; the length check rejects offsets/fractions strptime would too.
+    """
+    # Hand-edited or older exports may hold non-string dates: treat as unknown
+    if not isinstance(value, str) or len(value) != 19:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_chronological(entries) -> bool:
+    """Check (parsed datetime, message) pairs are in non-decreasing order"""
+    prev = datetime.min
+    for dt, _ in entries:
+        cur = dt or datetime.min
+        if cur < prev:
+            return False
+        prev = cur
+    return True
+
+
+def _day_key(entry) -> Optional[date]:
+    dt = entry[0]
+    return dt.date() if dt else None
+
+
+def _group_by_day(entries) -> Iterator[tuple[Optional[date], Iterator]]:
+    """Group consecutive (parsed datetime, message) pairs by day"""
+    # groupby does the run detection in C; groups are consumed in order
+    return groupby(entries, key=_day_key)
+
+
+_MSG_FMT = (
+    '<div class="msg">\n<div class="meta">\n'
+    '{from_html}<div class="date">{date}</div>\n</div>\n'  # .meta
+    '{text_html}{media_html}</div>\n'
+)
+
+_IMAGE_EXTS = frozenset({".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"})
 
 
 def _render_media_item(mi: Union[str, dict], base_path: str = "") -> str:
     """Render media item with security checks"""
     # Legacy string format
     if isinstance(mi, str):
-        ext = os.path.splitext(mi)[1].lower()
+        # Extension of the last path component only
+        dot = mi.rfind(".")
+        ext = mi[dot:].lower() if dot > max(mi.rfind("/"), mi.rfind("\\")) else ""
         safe_path = _sanitize_url(mi)
+        safe_fname = _escape(os.path.basename(mi))
         
-        if ext in {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}:
-            fname = os.path.basename(mi)
-            return f'<img src="{safe_path}" alt="{_escape(fname)}" loading="lazy">'
+        if ext in _IMAGE_EXTS:
+            return f'<img src="{safe_path}" alt="{safe_fname}" loading="lazy">'
         
-        fname = os.path.basename(mi)
-        return f'<a href="{safe_path}" download class="file">{_escape(fname)}</a>'
+        return f'<a href="{safe_path}" download class="file">{safe_fname}</a>'
 
     # Structured format
     kind = mi.get("kind", "file")
@@ -336,144 +415,268 @@ def _render_media_item(mi: Union[str, dict], base_path: str = "") -> str:
     return f'<a href="{safe_path}" download class="file">{safe_name}</a>'
 
 
-def _anonymize_display(name: str, cache: dict, seq: list[int]) -> str:
+def _iter_messages(json_path: str) -> Iterator[dict]:
+    """
+    Yield exported messages one by one.
+
+    orjson parses the whole file several times faster than json; without
+    it, ijson parses the array incrementally so the raw file text is never
+    held in memory next to the decoded messages.
     """
-    Stable anonymization: unique real name → UserN
+    if orjson is not None:
+        with open(json_path, "rb") as f:
+            items = orjson.loads(f.read())
+        yield from items
+        return
+    if ijson is not None:
+        with open(json_path, "rb") as f:
+            yield from ijson.items(f, "item")
+        return
+    with open(json_path, "rb") as f:
+        yield from json.loads(f.read())
+
+
+class HtmlWriter:
     """
-    if not name:
-        return "User?"
-    if name not in cache:
-        seq[0] += 1
-        cache[name] = f"User{seq[0]}"
-    return cache[name]
+    Incremental index.html writer.
 
+    Message blocks are appended as they arrive instead of regenerating the
+    whole page. The message count in <title>/topbar is a fixed-width field
+    patched in place, and the closing tail is rewritten after every batch so
+    the file on disk is always a complete document.
+    """
 
-def generate_html(
-    json_path: str,
+    _COUNT_WIDTH = 10
+
+    def __init__(
+        self,
+        out_html: str,
+        media_root: str,
+        channel_title: Optional[str] = "Архив диалога",
+        refresh_seconds: Optional[int] = None,
+        anonymize: bool = False,
+        csp: bool = True,
+    ) -> None:
+        self.out_html = out_html
+        self.media_root = media_root
+        self.channel_title = channel_title or "Архив диалога"
+        self.refresh_seconds = refresh_seconds
+        self.anonymize = anonymize
+        self.csp = csp
+        self._f = None
+        self._count_offsets: list[int] = []
+        self._tail_offset = 0
+        self._has_day = False
+        self._last_day = None
+        # Stable anonymization: each unique real name → UserN on first sight
+        numbers = count(1)
+        self._anon_names: defaultdict[str, str] = defaultdict(lambda: f"User{next(numbers)}")
+
+    def open(self, count: Optional[int] = None) -> None:
+        """Write head and tail; with count given, the title gets a live counter"""
+        title = _escape(self.channel_title).encode("utf-8")
+        if count is not None:
+            title_parts = (title + " — ".encode("utf-8"), None, " сообщений".encode("utf-8"))
+        else:
+            title_parts = (title,)
+
+        # Auto-refresh meta
+        auto_refresh = b""
+        if self.refresh_seconds and self.refresh_seconds > 0:
+            auto_refresh = f'<meta http-equiv="refresh" content="{int(self.refresh_seconds)}">'.encode("ascii")
+
+        # CSP meta
+        csp_meta = _CSP_META_BYTES if self.csp else b""
+
+        f = self._f = open(self.out_html, "wb", buffering=1 << 20)
+        f.write(_HEAD_START)
+        self._write_title(title_parts, count)
+        f.write(_HEAD_TITLE_END)
+        f.write(csp_meta)
+        f.write(auto_refresh)
+        f.write(_HEAD_BODY)
+        self._write_title(title_parts, count)
+        f.write(_HEAD_END)
+        self._tail_offset = f.tell()
+        f.write(_TAIL)
+        f.flush()
+
+        _write_css(os.path.dirname(self.out_html))
+
+    def _write_title(self, parts, count: Optional[int]) -> None:
+        # None marks the live counter; remember where it lands for set_count
+        for part in parts:
+            if part is None:
+                self._count_offsets.append(self._f.tell())
+                self._f.write(self._format_count(count))
+            else:
+                self._f.write(part)
+
+    def append_messages(self, messages, count: Optional[int] = None) -> None:
+        """Append messages (already in chronological order) and update the counter"""
+        self.append_entries([(_parse_dt(m.get("date")), m) for m in messages])
+        if count is not None:
+            self.set_count(count)
+
+    def append_entries(self, entries) -> None:
+        """Append pre-parsed (datetime, message) pairs, already in order"""
+        if not entries:
+            return
+        f = self._f
+        f.seek(self._tail_offset)
+        for day, day_entries in _group_by_day(entries):
+            if not self._has_day or day != self._last_day:
+                day_h = day.strftime("%d %B %Y") if day else "unknown"
+                f.write(f'<div class="day-sep">{_escape_text(day_h)}</div>\n'.encode("utf-8"))
+                self._has_day = True
+                self._last_day = day
+
+            for dt, m in day_entries:
+                f.write(self._message_html(dt, m))
+
+        self._tail_offset = f.tell()
+        f.write(_TAIL)
+        f.truncate()
+        f.flush()
+
+    def set_count(self, count: int) -> None:
+        """Patch the live counter in place"""
+        if not self._count_offsets:
+            return
+        value = self._format_count(count)
+        for offset in self._count_offsets:
+            self._f.seek(offset)
+            self._f.write(value)
+        self._f.seek(self._tail_offset)
+        self._f.flush()
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def _format_count(self, count: Optional[int]) -> bytes:
+        return f"{count or 0:>{self._COUNT_WIDTH}}".encode("ascii")
+
+    def _message_html(self, dt: Optional[datetime], m: dict) -> bytes:
+        """Render and encode one message block"""
+        # Date
+        date_str = ""
+        if m.get("date"):
+            date_str = dt.strftime("%H:%M") if dt else str(m["date"])
+
+        # Author
+        from_disp = ""
+        fr = m.get("from")
+        if isinstance(fr, dict):
+            from_disp = fr.get("display") or ""
+            if self.anonymize and from_disp:
+                from_disp = self._anon_names[from_disp]
+
+        text_html = _escape_text(m.get("text", ""))
+
+        # Media
+        media_list = m.get("media") or []
+        media_html = ""
+        if media_list:
+            media_root = self.media_root
+            media_html = '<div class="media">\n{}</div>\n'.format(
+                "".join([_render_media_item(mi, media_root) + "\n" for mi in media_list])
+            )
+
+        # Optional parts are empty strings: one format and one encode per message
+        return _MSG_FMT.format(
+            from_html=f'<div class="from">{_escape_label(from_disp)}</div>\n' if from_disp else "",
+            date=_escape_label(date_str),
+            text_html=f'<div class="text">{text_html}</div>\n' if text_html else "",
+            media_html=media_html,
+        ).encode("utf-8")
+
+
+def _write_css(out_dir: str) -> None:
+    """Write external CSS file (for CSP compliance) unless it is already current"""
+    css_path = os.path.join(out_dir, "styles.css")
+    try:
+        with open(css_path, "rb") as f:
+            if f.read(len(_EXTERNAL_CSS_BYTES) + 1) == _EXTERNAL_CSS_BYTES:
+                return
+    except OSError:
+        pass
+    with open(css_path, "wb") as f:
+        f.write(_EXTERNAL_CSS_BYTES)
+
+
+def generate_html_from_messages(
+    messages: Iterable[dict],
     media_root: str,
+    out_html: str,
     channel_title: Optional[str] = "Архив диалога",
-    out_html: Optional[str] = None,
     refresh_seconds: Optional[int] = None,
     total_count: Optional[int] = None,
     anonymize: bool = False,
     csp: bool = True,  # CSP enabled by default for security
+    assume_sorted: bool = False,
 ) -> str:
     """
-    Generate secure HTML from JSON with:
+    Generate secure HTML from already loaded messages with:
     - Strict CSP (no inline styles/scripts)
     - Enhanced XSS protection
     - URL sanitization
     """
     
-    # Load messages
-    with open(json_path, "r", encoding="utf-8") as f:
-        messages = json.load(f)
-
-    # Sort by date
-    def _key(m):
-        try:
-            return datetime.strptime(m["date"], "%Y-%m-%d %H:%M:%S")
-        except Exception:
-            return datetime.min
-
-    messages.sort(key=_key)
-    grouped = _group_by_day(messages)
-
-    # Anonymization maps
-    anon_map = {}
-    anon_seq = [0]
-
-    # Build content
-    parts = []
-    for day, msgs in grouped:
-        try:
-            dt_day = datetime.strptime(day, "%Y-%m-%d")
-            day_h = dt_day.strftime("%d %B %Y")
-        except Exception:
-            day_h = day
-        
-        parts.append(f'<div class="day-sep">{_escape(day_h)}</div>')
-
-        for m in msgs:
-            # Date
-            date_str = ""
-            if m.get("date"):
-                try:
-                    date_str = datetime.strptime(m["date"], "%Y-%m-%d %H:%M:%S").strftime("%H:%M")
-                except Exception:
-                    date_str = m["date"]
-
-            # Author
-            from_disp = ""
-            fr = m.get("from")
-            if isinstance(fr, dict):
-                from_disp = fr.get("display") or ""
-                if anonymize and from_disp:
-                    from_disp = _anonymize_display(from_disp, anon_map, anon_seq)
-
-            text_html = _escape(m.get("text", ""))
-
-            # Build message HTML
-            block = ['<div class="msg">']
-            block.append('<div class="meta">')
-            
-            if from_disp:
-                block.append(f'<div class="from">{_escape(from_disp)}</div>')
-            
-            block.append(f'<div class="date">{_escape(date_str)}</div>')
-            block.append('</div>')  # .meta
-
-            if text_html:
-                block.append(f'<div class="text">{text_html}</div>')
-
-            # Media
-            media_list = m.get("media") or []
-            if media_list:
-                block.append('<div class="media">')
-                for mi in media_list:
-                    block.append(_render_media_item(mi, media_root))
-                block.append("</div>")
-
-            block.append("</div>")
-            parts.append("\n".join(block))
-
-    content = "\n".join(parts)
+    # Parse every date once; the result drives sorting, grouping and display
+    entries = [(_parse_dt(m.get("date")), m) for m in messages]
+    # Exports are written in chronological order, so sort only when a
+    # linear scan actually finds a message out of place
+    if not assume_sorted and not _is_chronological(entries):
+        entries.sort(key=lambda e: e[0] or datetime.min)
 
     # Title with count
     title = channel_title or "Архив диалога"
     if total_count is not None:
         title = f"{title} — {total_count} сообщений"
-    
-    title_escaped = _escape(title)
-
-    # Auto-refresh meta
-    auto_refresh = ""
-    if refresh_seconds and refresh_seconds > 0:
-        auto_refresh = f'<meta http-equiv="refresh" content="{int(refresh_seconds)}">'
-
-    # CSP meta
-    csp_meta = _CSP_META if csp else ""
-
-    # Generate HTML
-    html_content = _BASE_TEMPLATE.format(
-        title=title_escaped,
-        title_escaped=title_escaped,
-        content=content,
-        auto_refresh=auto_refresh,
-        csp=csp_meta
+
+    # Stream HTML file: messages are written as they are rendered, so peak
+    # memory stays at one message instead of the whole document
+    writer = HtmlWriter(
+        out_html,
+        media_root,
+        channel_title=title,
+        refresh_seconds=refresh_seconds,
+        anonymize=anonymize,
+        csp=csp,
     )
+    try:
+        writer.open()
+        writer.append_entries(entries)
+    finally:
+        writer.close()
+    
+    return out_html
+
 
-    # Determine output path
+def generate_html(
+    json_path: str,
+    media_root: str,
+    channel_title: Optional[str] = "Архив диалога",
+    out_html: Optional[str] = None,
+    refresh_seconds: Optional[int] = None,
+    total_count: Optional[int] = None,
+    anonymize: bool = False,
+    csp: bool = True,  # CSP enabled by default for security
+    assume_sorted: bool = False,
+) -> str:
+    """Generate HTML from an exported JSON file (index.html next to it by default)"""
     if not out_html:
         out_html = os.path.join(os.path.dirname(json_path), "index.html")
-    
-    # Write HTML file
-    with open(out_html, "w", encoding="utf-8") as f:
-        f.write(html_content)
-    
-    # Write external CSS file (for CSP compliance)
-    css_path = os.path.join(os.path.dirname(out_html), "styles.css")
-    with open(css_path, "w", encoding="utf-8") as f:
-        f.write(_EXTERNAL_CSS)
-    
-    return out_html
\ No newline at end of file
+    return generate_html_from_messages(
+        _iter_messages(json_path),
+        media_root,
+        out_html,
+        channel_title=channel_title,
+        refresh_seconds=refresh_seconds,
+        total_count=total_count,
+        anonymize=anonymize,
+        csp=csp,
+        assume_sorted=assume_sorted,
+    )
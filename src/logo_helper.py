@@ -2,12 +2,28 @@
 logo_helper.py - Утилиты для работы с логотипом в GUI
 """
 
+import functools
 import os
 import sys
-from typing import Optional, Tuple
-from PIL import Image, ImageDraw, ImageTk
+from typing import TYPE_CHECKING, Optional, Tuple
 
+if TYPE_CHECKING:
+    from PIL import Image
 
+# Pillow (and ImageTk's Tk bindings) is imported on first use, not on import
+_PIL = None
+
+
+def _pil():
+    """(Image, ImageDraw, ImageTk), imported once on first call"""
+    global _PIL
+    if _PIL is None:
+        from PIL import Image, ImageDraw, ImageTk
+        _PIL = (Image, ImageDraw, ImageTk)
+    return _PIL
+
+
+@functools.lru_cache(maxsize=32)
 def get_resource_path(relative_path: str) -> str:
     """
     Получить путь к ресурсу (работает в .exe и в разработке)
@@ -24,7 +40,7 @@ def get_resource_path(relative_path: str) -> str:
     return os.path.join(base_path, "assets", relative_path)
 
 
-def load_logo_image(size: int = 64) -> Optional[Image.Image]:
+def load_logo_image(size: int = 64) -> Optional["Image.Image"]:
     """
     Загружает лого из файла или создаёт дефолтное
     
@@ -34,6 +50,15 @@ def load_logo_image(size: int = 64) -> Optional[Image.Image]:
     Returns:
         PIL.Image или None если не удалось загрузить
     """
+    # Decoding and resizing happen once per size; callers get their own copy
+    logo = _load_logo_cached(size)
+    return logo.copy() if logo is not None else None
+
+
+@functools.lru_cache(maxsize=8)
+def _load_logo_cached(size: int) -> Optional["Image.Image"]:
+    Image = _pil()[0]
+
     # Пробуем найти кастомное лого
     logo_paths = [
         get_resource_path(f"logo_{size}.png"),
@@ -41,21 +66,23 @@ def load_logo_image(size: int = 64) -> Optional[Image.Image]:
     ]
     
     for path in logo_paths:
-        if os.path.exists(path):
-            try:
-                logo = Image.open(path)
-                # Подгоняем размер с сохранением пропорций
-                logo.thumbnail((size, size), Image.Resampling.LANCZOS)
-                return logo
-            except Exception as e:
-                print(f"Не удалось загрузить {path}: {e}")
-                continue
+        # Opening directly: a missing file costs one failed open, not a stat too
+        try:
+            logo = Image.open(path)
+            # Подгоняем размер с сохранением пропорций
+            logo.thumbnail((size, size), Image.Resampling.LANCZOS)
+            return logo
+        except (FileNotFoundError, IsADirectoryError):
+            continue
+        except Exception as e:
+            print(f"Не удалось загрузить {path}: {e}")
+            continue
     
     # Если не нашли, создаём дефолтное
     return create_default_logo(size)
 
 
-def create_default_logo(size: int = 64) -> Image.Image:
+def create_default_logo(size: int = 64) -> "Image.Image":
     """
     Создаёт дефолтное лого в стиле Telegram
     
@@ -65,6 +92,7 @@ def create_default_logo(size: int = 64) -> Image.Image:
     Returns:
         PIL.Image с дефолтным лого
     """
+    Image, ImageDraw, _ = _pil()
     img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
     draw = ImageDraw.Draw(img)
     
@@ -91,7 +119,7 @@ def create_default_logo(size: int = 64) -> Image.Image:
 
 
 def get_logo_for_canvas(canvas_size: Tuple[int, int], 
-                        logo_size: Optional[int] = None) -> Tuple[Image.Image, int]:
+                        logo_size: Optional[int] = None) -> Tuple["Image.Image", int]:
     """
     Подготавливает лого для отрисовки на Canvas
     
@@ -114,7 +142,7 @@ def get_logo_for_canvas(canvas_size: Tuple[int, int],
     return logo, logo_size
 
 
-def create_tray_icon(size: int = 64) -> Optional[Image.Image]:
+def create_tray_icon(size: int = 64) -> Optional["Image.Image"]:
     """
     Создаёт иконку для трея (системного лотка)
     
@@ -146,7 +174,7 @@ def create_canvas_logo(canvas, x: int, y: int, size: int = 56) -> Optional[int]:
             return None
         
         # Конвертируем для tkinter
-        photo = ImageTk.PhotoImage(logo_img)
+        photo = _pil()[2].PhotoImage(logo_img)
         
         # Сохраняем ссылку, чтобы изображение не было удалено сборщиком мусора
         if not hasattr(canvas, '_logo_images'):
@@ -3,11 +3,10 @@ import os
 import sys
 import asyncio
 import logging
-from dotenv import load_dotenv
 from .process_hardening import harden_process
 from .telegram_api import authorize, list_user_dialogs
 from .channel_data import dump_dialog_to_json_and_media
-from .html_generator import generate_html
+from .html_generator import HtmlWriter, generate_html_from_messages
 
 # Apply process-level hardening before bootstrapping the app
 harden_process()
@@ -28,6 +27,7 @@ logging.getLogger("telethon").setLevel(logging.WARNING)
 
 LIVE_REFRESH_SECONDS = None  # Manual F5 refresh
 BATCH_SAVE_EVERY = 50  # How often to update index.html during export
+LIVE_FLUSH_INTERVAL = 1.0  # Seconds; caps live index.html writes at ~1 Hz
 
 
 def _yesno(prompt: str, default: bool = False) -> bool:
@@ -63,7 +63,9 @@ def _pick_dialog(dials):
     if not dials:
         raise SystemExit("No available dialogs (users/groups/channels).")
     
-    print("\nAvailable dialogs:")
+    # The listing is built in memory and written once: one stdout write
+    # instead of one per dialog
+    lines = ["\nAvailable dialogs:"]
     for i, d in enumerate(dials, 1):
         kind = getattr(d, "_tgdl_kind", "?")
         title = (
@@ -73,8 +75,10 @@ def _pick_dialog(dials):
         )
         
         # Sanitize title for display
-        safe_title = title[:80] if len(title) > 80 else title
-        print(f"{i}. [{kind}] {safe_title}")
+        lines.append(f"{i}. [{kind}] {title[:80]}")
+    lines.append("")
+    sys.stdout.write("\n".join(lines))
+    sys.stdout.flush()
     
     max_attempts = 3
     for attempt in range(max_attempts):
@@ -100,6 +104,8 @@ def _pick_dialog(dials):
 async def async_main():
     """Main async function with security enhancements"""
     try:
+        from dotenv import load_dotenv  # Only needed once, at startup
+
         load_dotenv()
 
         print("=" * 60)
@@ -133,38 +139,72 @@ async def async_main():
             print(f"\nSelected dialog: {safe_title}")
             print()
 
-            # Progress callback
-            def on_progress(json_path, media_dir, count):
+            # Live HTML: new messages are appended to index.html per batch
+            # instead of regenerating the whole page, at most once per
+            # LIVE_FLUSH_INTERVAL; batches arriving faster are coalesced
+            loop = asyncio.get_running_loop()
+            live = {"writer": None, "pending": [], "count": 0, "last_flush": 0.0, "timer": None}
+            # Every saved message, so the final page needs no JSON re-read
+            all_messages: list = []
+
+            def flush_html():
+                live["timer"] = None
+                live["last_flush"] = loop.time()
+                pending, live["pending"] = live["pending"], []
                 try:
-                    generate_html(
-                        json_path=json_path,
-                        media_root=media_dir,
-                        channel_title=dialog_title,
-                        refresh_seconds=LIVE_REFRESH_SECONDS,
-                        total_count=count,
-                        anonymize=use_anon,
-                        csp=True,  # Always use CSP
-                    )
-                    log.info("HTML updated (intermediate), messages: %s", count)
+                    writer = live["writer"]
+                    if writer is None:
+                        writer = HtmlWriter(
+                            os.path.join(os.path.dirname(live["json_path"]), "index.html"),
+                            live["media_dir"],
+                            channel_title=dialog_title,
+                            refresh_seconds=LIVE_REFRESH_SECONDS,
+                            anonymize=use_anon,
+                            csp=True,  # Always use CSP
+                        )
+                        live["writer"] = writer
+                        writer.open(count=live["count"])
+                    writer.append_messages(pending, count=live["count"])
+                    log.info("HTML updated (intermediate), messages: %s", live["count"])
                 except Exception as e:
                     log.error("Failed to generate HTML during progress: %s", e)
 
+            def on_batch(json_path, media_dir, new_messages, count):
+                live["json_path"], live["media_dir"] = json_path, media_dir
+                all_messages.extend(new_messages)
+                live["pending"].extend(new_messages)
+                live["count"] = count
+                if live["timer"] is not None:
+                    return
+                delay = live["last_flush"] + LIVE_FLUSH_INTERVAL - loop.time()
+                if delay <= 0:
+                    flush_html()
+                else:
+                    live["timer"] = loop.call_later(delay, flush_html)
+
             # Export dialog
             print("Starting export...")
-            json_path, media_dir = await dump_dialog_to_json_and_media(
-                client, 
-                chosen,
-                out_root="export",
-                progress_every=BATCH_SAVE_EVERY,
-                on_progress=on_progress,
-                skip_dangerous=block_danger,
-            )
+            try:
+                json_path, media_dir = await dump_dialog_to_json_and_media(
+                    client, 
+                    chosen,
+                    out_root="export",
+                    progress_every=BATCH_SAVE_EVERY,
+                    on_batch=on_batch,
+                    skip_dangerous=block_danger,
+                )
+            finally:
+                if live["timer"] is not None:
+                    live["timer"].cancel()
+                if live["writer"] is not None:
+                    live["writer"].close()
 
             # Generate final HTML
             print("\nGenerating final HTML...")
-            html_path = generate_html(
-                json_path=json_path,
-                media_root=media_dir,
+            html_path = generate_html_from_messages(
+                all_messages,
+                media_dir,
+                os.path.join(os.path.dirname(json_path), "index.html"),
                 channel_title=dialog_title,
                 refresh_seconds=LIVE_REFRESH_SECONDS,
                 anonymize=use_anon,
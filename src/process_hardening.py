@@ -1,7 +1,6 @@
 """Utilities for hardening the process to reduce credential exposure."""
 from __future__ import annotations
 
-import ctypes
 import logging
 import os
 import threading
@@ -16,18 +15,47 @@ _lock = threading.Lock()
 _hardened = False
 
 
+def _load_set_error_mode():
+    """Resolve kernel32!SetErrorMode with its signature, or None."""
+    try:
+        func = ctypes.WinDLL("kernel32", use_last_error=True).SetErrorMode
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_uint]
+    func.restype = ctypes.c_uint
+    return func
+
+
+def _load_wer_set_flags():
+    """Resolve wer!WerSetFlags with its signature, or None."""
+    try:
+        func = ctypes.WinDLL("wer.dll", use_last_error=True).WerSetFlags
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_uint]
+    func.restype = ctypes.c_int
+    return func
+
+
+# Resolved once at import; POSIX never loads ctypes
+if os.name == "nt":
+    import ctypes
+
+    _SetErrorMode = _load_set_error_mode()
+    _WerSetFlags = _load_wer_set_flags()
+else:
+    _SetErrorMode = None
+    _WerSetFlags = None
+
+
 def _set_error_mode() -> bool:
     """Prevent Windows from showing error dialogs that spawn WER."""
-    try:
-        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
-    except OSError:
+    if _SetErrorMode is None:
         return False
 
     try:
-        kernel32.SetErrorMode.argtypes = [ctypes.c_uint]
-        kernel32.SetErrorMode.restype = ctypes.c_uint
-        current = kernel32.SetErrorMode(0)
-        kernel32.SetErrorMode(current | _SEM_FAILCRITICALERRORS | _SEM_NOGPFAULTERRORBOX)
+        current = _SetErrorMode(0)
+        _SetErrorMode(current | _SEM_FAILCRITICALERRORS | _SEM_NOGPFAULTERRORBOX)
         return True
     except Exception as exc:  # Defensive: best-effort only
         log.debug("SetErrorMode failed: %s", exc)
@@ -36,20 +64,11 @@ def _set_error_mode() -> bool:
 
 def _disable_wer_reports() -> bool:
     """Disable Windows Error Reporting crash dumps for this process."""
-    try:
-        wer = ctypes.WinDLL("wer.dll", use_last_error=True)
-    except OSError:
-        return False
-
-    try:
-        WerSetFlags = wer.WerSetFlags
-    except AttributeError:
+    if _WerSetFlags is None:
         return False
 
     try:
-        WerSetFlags.argtypes = [ctypes.c_uint]
-        WerSetFlags.restype = ctypes.c_int
-        hr = WerSetFlags(_WER_FAULT_REPORTING_FLAG_DISABLE)
+        hr = _WerSetFlags(_WER_FAULT_REPORTING_FLAG_DISABLE)
         # WerSetFlags returns S_OK (0) on success, or E_ACCESSDENIED (0x80070005)
         if hr == 0 or hr == -2147024891:  # HRESULT for E_ACCESSDENIED
             return True
@@ -1,19 +1,19 @@
 # telegram_api.py - SECURED VERSION
-import os
-import getpass
 import logging
 import inspect
-import secrets
-import ctypes
+import re
 from typing import Awaitable, Callable, List, Optional, Union
 
-from dotenv import load_dotenv
 from telethon import TelegramClient
 from telethon.errors import SessionPasswordNeededError
 from telethon.sessions import StringSession
 
 log = logging.getLogger("telegram_api")
 
+# Credential format checks, each a single C-level scan
+_HEX32_RE = re.compile(r"[0-9a-fA-F]{32}")
+_PHONE_DIGITS_RE = re.compile(r"[0-9 ]*[0-9][0-9 ]*")
+
 # ═══════════════════════════════════════════════════
 # SECURE CREDENTIAL HANDLING
 # ═══════════════════════════════════════════════════
@@ -30,19 +30,9 @@ class SecureString:
         return self._value
     
     def clear(self):
-        """Overwrite memory with zeros"""
-        if self._cleared:
-            return
-        try:
-            # Attempt to overwrite string in memory
-            if self._value:
-                buf = ctypes.create_string_buffer(len(self._value.encode()))
-                ctypes.memset(ctypes.addressof(buf), 0, len(self._value.encode()))
-        except Exception:
-            pass
-        finally:
-            self._value = ""
-            self._cleared = True
+        """Drop the reference to the credential (str storage can't be wiped in place)"""
+        self._value = ""
+        self._cleared = True
     
     def __del__(self):
         self.clear()
@@ -57,6 +47,26 @@ def _sanitize_for_log(value: str, field_name: str) -> str:
     return f"[{field_name}: {value[:2]}***{value[-2:]}]"
 
 
+def _prompt_callback(
+    cb: Callable[..., Union[str, Awaitable[str], None]],
+) -> Callable[[str], Awaitable[Optional[str]]]:
+    """Wrap a sync or async, prompt- or no-arg callback as `async (prompt) -> str | None`"""
+    try:
+        takes_prompt = bool(inspect.signature(cb).parameters)
+    except (TypeError, ValueError):  # No introspectable signature: pass the prompt
+        takes_prompt = True
+
+    async def wrapped(prompt: str) -> Optional[str]:
+        result = cb(prompt) if takes_prompt else cb()
+        if hasattr(result, "__await__"):
+            result = await result
+        if result is None:
+            return None
+        return str(result).strip() or None
+
+    return wrapped
+
+
 async def authorize(
     api_id: Optional[int] = None,
     api_hash: Optional[str] = None,
@@ -87,16 +97,11 @@ async def authorize(
             raise ValueError(f"{field_name} must not be empty")
         return cleaned
 
-    async def _request(cb: Callable[..., Union[str, Awaitable[str], None]], prompt: str) -> Optional[str]:
-        try:
-            result = cb(prompt)
-        except TypeError:
-            result = cb()
-        if inspect.isawaitable(result):
-            result = await result
-        if result is None:
-            return None
-        return str(result).strip() or None
+    # Callback arity is inspected once here, not probed on every prompt
+    if code_callback:
+        code_callback = _prompt_callback(code_callback)
+    if password_callback:
+        password_callback = _prompt_callback(password_callback)
 
     try:
         # Get API ID
@@ -123,7 +128,7 @@ async def authorize(
             api_hash = _stringify(api_hash, "API HASH")
         
         # Validate API Hash format (should be 32 hex characters)
-        if len(api_hash) != 32 or not all(c in '0123456789abcdefABCDEF' for c in api_hash):
+        if not _HEX32_RE.fullmatch(api_hash):
             log.warning("API Hash format appears invalid (expected 32 hex chars)")
         
         secure_api_hash = SecureString(api_hash)
@@ -137,14 +142,15 @@ async def authorize(
         # Validate phone format
         if not phone.startswith('+'):
             raise ValueError("Phone number must start with + (e.g. +1234567890)")
-        if not phone[1:].replace(' ', '').isdigit():
+        if not _PHONE_DIGITS_RE.fullmatch(phone, 1):
             raise ValueError("Phone number must contain only digits after +")
         
         secure_phone = SecureString(phone)
 
-        # Log sanitized credentials
-        log.info("Authorizing with API ID: %d, Phone: %s", 
-                 api_id, _sanitize_for_log(phone, "phone"))
+        # Log sanitized credentials (masking only runs when INFO is enabled)
+        if log.isEnabledFor(logging.INFO):
+            log.info("Authorizing with API ID: %d, Phone: %s",
+                     api_id, _sanitize_for_log(phone, "phone"))
 
         # Use in-memory session ONLY
         session = StringSession()
@@ -159,7 +165,7 @@ async def authorize(
             
             # Get verification code
             if code_callback:
-                code = await _request(code_callback, "Введите код из Telegram: ")
+                code = await code_callback("Введите код из Telegram: ")
             else:
                 code = input("Введите код из Telegram: ").strip()
 
@@ -180,8 +186,10 @@ async def authorize(
 
                 # Get 2FA password
                 if password_callback:
-                    pwd = await _request(password_callback, "Введите пароль 2FA: ")
+                    pwd = await password_callback("Введите пароль 2FA: ")
                 else:
+                    import getpass  # Console fallback only
+
                     pwd = getpass.getpass("Введите пароль 2FA: ")
 
                 if not pwd:
@@ -209,27 +217,27 @@ async def list_user_dialogs(client) -> List:
     """
     Returns ALL dialogs: users, groups/supergroups, channels.
     """
+    # Dialogs are classified as they stream in, so skipped ones are never
+    # collected into a full get_dialogs() list first
+    res = []
+    append = res.append
     try:
-        dialogs = await client.get_dialogs()
+        async for d in client.iter_dialogs():
+            # Telethon's Dialog always defines these flags; anything else
+            # (e.g. secret chats) is skipped right away
+            if d.is_user:
+                kind = "user"
+            elif d.is_group:
+                kind = "group"
+            elif d.is_channel:
+                kind = "channel"
+            else:
+                continue
+            d._tgdl_kind = kind
+            append(d)
     except Exception as e:
         log.error("Failed to retrieve dialogs: %s", e)
         raise
     
-    res = []
-    for d in dialogs:
-        try:
-            t = (
-                "user" if getattr(d, "is_user", False)
-                else "group" if getattr(d, "is_group", False)
-                else "channel" if getattr(d, "is_channel", False)
-                else "other"
-            )
-            if t in {"user", "group", "channel"}:
-                d._tgdl_kind = t
-                res.append(d)
-        except Exception as e:
-            log.warning("Failed to process dialog: %s", e)
-            continue
-    
     log.info("Found %d dialogs (users/groups/channels)", len(res))
     return res
\ No newline at end of file